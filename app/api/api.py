@@ -1,6 +1,7 @@
 from fastapi import APIRouter
-from .endpoints import countries, admin
+from .endpoints import countries, admin, search
 
 api_router = APIRouter()
 api_router.include_router(countries.router, prefix="/countries", tags=["countries"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -1,141 +1,220 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ...database import get_db
+import asyncio
+import inspect
+import time
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from ...database import SessionLocal, AsyncSessionLocal
+from ...cache import bump_data_version
+from ...search import rebuild_search_index
+from ...jobs import job_runner, Job
 
 router = APIRouter()
 
-@router.post("/sync-rest-countries")
-async def sync_rest_countries(db: Session = Depends(get_db)):
+# Sync endpoints only queue a job and return its id; progress is read from /jobs
+
+async def run_with_sync_db(func, *args, **kwargs):
+    """Run a scraper on a sync Session, then refresh search and bump the data version"""
+    db = SessionLocal()
+    try:
+        result = func(db, *args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        rebuild_search_index(db)
+        bump_data_version(db)
+        return result
+    finally:
+        db.close()
+        # Jobs run one at a time, parse workers are not kept idle between them
+        from ...scrapers.parse_pool import parse_pool
+        parse_pool.shutdown()
+
+async def run_with_scraper_db(func, *args, **kwargs):
+    """Same for BaseScraper-based scrapers, which work on an AsyncSession"""
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await func(db, *args, **kwargs)
+            await db.run_sync(rebuild_search_index)
+            await db.run_sync(bump_data_version)
+            return result
+    finally:
+        from ...scrapers.parse_pool import parse_pool
+        parse_pool.shutdown()
+
+def enqueue(name: str, func, **params) -> dict:
+    """Queue a sync job, or return the identical one that is already queued/running"""
+    job, created = job_runner.submit(name, func, **params)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "created": created,
+        "status_url": f"/api/admin/jobs/{job.id}",
+        "events_url": f"/api/admin/jobs/{job.id}/events",
+    }
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data, default=str).decode()}\n\n"
+
+@router.get("/jobs")
+async def list_jobs():
+    """Admin endpoint - queued, running and recently finished sync jobs"""
+    return [job.to_dict() for job in reversed(job_runner.jobs.values())]
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Admin endpoint - job status with per-country progress and errors"""
+    return get_job_or_404(job_id).to_dict(detail=True)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, interval: float = Query(1.0, ge=0.2, le=10.0)):
+    """
+    Admin endpoint - Server-Sent Events stream of a job: a `progress` event every
+    `interval` seconds (throughput, new errors) and a final `done` event.
+    """
+    job = get_job_or_404(job_id)
+
+    async def stream():
+        sent_errors = 0
+        last_done, last_at = job.progress()["done"], time.monotonic()
+        while True:
+            if await request.is_disconnected():
+                return
+            data = job.to_dict()
+            done, now = data["progress"]["done"], time.monotonic()
+            data["progress"]["recent_countries_per_second"] = round((done - last_done) / (now - last_at), 2) if now > last_at else 0.0
+            last_done, last_at = done, now
+            data["new_errors"] = job.errors[sent_errors:]
+            sent_errors += len(data["new_errors"])
+            yield sse_event("progress", data)
+            if job.finished:
+                yield sse_event("done", job.to_dict(detail=True))
+                return
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.post("/sync-rest-countries", status_code=202)
+async def sync_rest_countries():
     """Admin endpoint - sync data from REST Countries API"""
     from ...scrapers.rest_countries import sync_countries
 
-    result = await sync_countries(db)
-    return result
+    return enqueue("sync-rest-countries", lambda: run_with_sync_db(sync_countries))
 
-@router.post("/sync-exchange-rates")
-async def sync_exchange_rates(db: Session = Depends(get_db)):
+@router.post("/sync-exchange-rates", status_code=202)
+async def sync_exchange_rates():
     """Admin endpoint - sync currency exchange rates"""
     from ...scrapers.exchange_rates import sync_rates
 
-    result = await sync_rates(db)
-    return result
+    return enqueue("sync-exchange-rates", lambda: run_with_scraper_db(sync_rates))
 
-@router.post("/sync-static-info")
-async def sync_static_info(db: Session = Depends(get_db)):
+@router.post("/sync-static-info", status_code=202)
+async def sync_static_info():
     """Admin endpoint - sync static info from JSON"""
     from ...scrapers.static_info import sync_static_data
 
-    result = sync_static_data(db)
-    return result
+    return enqueue("sync-static-info", lambda: run_with_sync_db(sync_static_data))
 
-@router.post("/sync-costs")
-async def sync_costs_endpoint(db: Session = Depends(get_db)):
+@router.post("/sync-costs", status_code=202)
+async def sync_costs_endpoint():
     """Admin endpoint - sync cost of living indices"""
     from ...scrapers.costs import sync_costs
 
-    result = sync_costs(db)
-    return result
+    return enqueue("sync-costs", lambda: run_with_scraper_db(sync_costs))
 
-@router.post("/sync-cdc")
-async def sync_cdc_endpoint(db: Session = Depends(get_db)):
+@router.post("/sync-cdc", status_code=202)
+async def sync_cdc_endpoint():
     """Admin endpoint - sync vaccinations from CDC"""
     from ...scrapers.cdc_health import sync_all_cdc
 
-    result = await sync_all_cdc(db)
-    return result
+    return enqueue("sync-cdc", lambda: run_with_scraper_db(sync_all_cdc))
 
-@router.post("/sync-unesco-sites")
-async def sync_unesco_sites(db: Session = Depends(get_db)):
+@router.post("/sync-unesco-sites", status_code=202)
+async def sync_unesco_sites():
     """Admin endpoint - sync UNESCO World Heritage sites"""
     from ...scrapers.unesco import sync_unesco_sites
 
-    result = await sync_unesco_sites(db)
-    return result
+    return enqueue("sync-unesco-sites", lambda: run_with_scraper_db(sync_unesco_sites))
 
-@router.post("/sync-attractions-wiki")
-async def sync_attractions_wiki(db: Session = Depends(get_db)):
+@router.post("/sync-attractions-wiki", status_code=202)
+async def sync_attractions_wiki():
     """Admin endpoint - sync top attractions from Wikidata"""
     from ...scrapers.wikidata_attractions import sync_all_wiki_attractions
 
-    result = await sync_all_wiki_attractions(db)
-    return result
+    return enqueue("sync-attractions-wiki", lambda: run_with_scraper_db(sync_all_wiki_attractions))
 
-@router.post("/sync-wikidata-info")
-async def sync_wikidata_info(db: Session = Depends(get_db)):
+@router.post("/sync-wikidata-info", status_code=202)
+async def sync_wikidata_info():
     """Admin endpoint - sync extended country info from Wikidata (religions, transport, etc)"""
     from ...scrapers.wikidata_info import sync_all_wikidata_info
 
-    result = await sync_all_wikidata_info(db)
-    return result
+    return enqueue("sync-wikidata-info", lambda: run_with_scraper_db(sync_all_wikidata_info))
 
-@router.post("/sync-wiki-summaries")
-async def sync_wiki_summaries(db: Session = Depends(get_db)):
+@router.post("/sync-wiki-summaries", status_code=202)
+async def sync_wiki_summaries():
     """Admin endpoint - sync country summaries and symbols from Wikipedia/Wikidata"""
     from ...scrapers.wiki_summaries import sync_all_summaries
 
-    result = await sync_all_summaries(db)
-    return result
+    return enqueue("sync-wiki-summaries", lambda: run_with_scraper_db(sync_all_summaries))
 
-@router.post("/sync-visas")
-async def sync_visas_endpoint(db: Session = Depends(get_db)):
+@router.post("/sync-visas", status_code=202)
+async def sync_visas_endpoint():
     """Admin endpoint - sync detailed visa requirements from Wikipedia"""
     from ...scrapers.visa_wiki import sync_all_visas
 
-    result = await sync_all_visas(db)
-    return result
+    return enqueue("sync-visas", lambda: run_with_sync_db(sync_all_visas))
 
-@router.post("/sync-embassies")
-async def sync_embassies(db: Session = Depends(get_db)):
+@router.post("/sync-embassies", status_code=202)
+async def sync_embassies():
     """Admin endpoint - sync Polish embassies and consulates"""
     from ...scrapers.embassies import scrape_embassies
 
-    result = await scrape_embassies(db)
-    return result
+    return enqueue("sync-embassies", lambda: run_with_scraper_db(scrape_embassies))
 
-@router.post("/sync-emergency")
-async def sync_emergency(db: Session = Depends(get_db)):
+@router.post("/sync-emergency", status_code=202)
+async def sync_emergency():
     """Admin endpoint - sync emergency numbers"""
     from ...scrapers.emergency import sync_emergency_numbers
 
-    result = await sync_emergency_numbers(db)
-    return result
+    return enqueue("sync-emergency", lambda: run_with_scraper_db(sync_emergency_numbers))
 
-@router.post("/sync-holidays")
-async def sync_holidays_endpoint(db: Session = Depends(get_db)):
+@router.post("/sync-holidays", status_code=202)
+async def sync_holidays_endpoint():
     """Admin endpoint - sync public holidays"""
     from ...scrapers.holidays import sync_all_holidays
 
-    result = await sync_all_holidays(db)
-    return result
+    return enqueue("sync-holidays", lambda: run_with_scraper_db(sync_all_holidays))
 
-@router.post("/sync-climate")
-async def sync_climate_endpoint(force: bool = False, db: Session = Depends(get_db)):
+@router.post("/sync-climate", status_code=202)
+async def sync_climate_endpoint(force: bool = False):
     """Admin endpoint - sync climate data from Open-Meteo"""
     from ...scrapers.climate import sync_all_climate
 
-    result = await sync_all_climate(db, force=force)
-    return result
+    return enqueue("sync-climate", lambda: run_with_scraper_db(sync_all_climate, force=force), force=force)
 
-@router.post("/update-all-weather")
-async def update_all_weather_endpoint(db: Session = Depends(get_db)):
+@router.post("/update-all-weather", status_code=202)
+async def update_all_weather_endpoint():
     """Admin endpoint - update weather for all countries"""
     from ...scrapers.weather import update_all_weather
 
-    result = await update_all_weather(db)
-    return result
+    return enqueue("update-all-weather", lambda: run_with_sync_db(update_all_weather))
 
-@router.post("/scrape-msz-gov-pl/{iso_code}")
-async def scrape_gov_pl(iso_code: str, db: Session = Depends(get_db)):
+@router.post("/scrape-msz-gov-pl/{iso_code}", status_code=202)
+async def scrape_gov_pl(iso_code: str):
     """Admin endpoint - scrape MSZ data for specific country"""
     from ...scrapers.msz_gov_pl import scrape_country
 
-    result = await scrape_country(db, iso_code.upper())
-    return result
+    iso_code = iso_code.upper()
+    return enqueue("scrape-msz-gov-pl", lambda: run_with_scraper_db(scrape_country, iso_code), iso_code=iso_code)
 
-@router.post("/scrape-all-msz-gov-pl")
-async def scrape_all_gov_pl(db: Session = Depends(get_db)):
+@router.post("/scrape-all-msz-gov-pl", status_code=202)
+async def scrape_all_gov_pl():
     """Admin endpoint - scrape data for ALL countries (with rate limiting and slug cache)"""
     from ...scrapers.msz_gov_pl import scrape_all_with_cache
 
-    results = await scrape_all_with_cache(db)
-    return results
+    return enqueue("scrape-all-msz-gov-pl", lambda: run_with_scraper_db(scrape_all_with_cache))
@@ -1,35 +1,177 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ...database import get_db
+import os
+from ...database import get_async_db
+from ...cache import (
+    CachedResponse, response_cache, detail_key, list_key,
+    serialize_country_detail, serialize_country_list, combine_country_details
+)
+from ...serialization import MSGPACK_MEDIA_TYPE, negotiate_media_type, json_to_msgpack
 from ... import schemas, crud
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.CountryBasic])
-def get_countries(
+# Browser/CDN caching policy for read endpoints
+CACHE_CONTROL = os.environ.get("API_CACHE_CONTROL", "public, max-age=300")
+# Maximum number of countries in one /batch request
+MAX_BATCH_SIZE = 50
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+def msgpack_variant(key: str, entry: CachedResponse) -> CachedResponse:
+    """MessagePack copy of a cached JSON response, cached under its own key"""
+    variant = response_cache.get(key + "#msgpack")
+    if variant is None:
+        version = response_cache.version
+        variant = entry._replace(body=json_to_msgpack(entry.body), etag=entry.etag[:-1] + '-msgpack"')
+        response_cache.set(key + "#msgpack", variant, version)
+    return variant
+
+def cached_response(request: Request, key: str, entry: CachedResponse) -> Response:
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    if media_type == MSGPACK_MEDIA_TYPE:
+        entry = msgpack_variant(key, entry)
+
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Surrogate-Key": entry.surrogate_keys,
+        "Vary": "Accept",
+    }
+    if entry.next_cursor:
+        headers["X-Next-Cursor"] = entry.next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=entry.next_cursor)}>; rel="next"'
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=media_type, headers=headers)
+
+@router.get("/", response_model=List[schemas.CountryBasic],
+            responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+async def get_countries(
+        request: Request,
         skip: int = 0,
         limit: int = 100,
         region: Optional[str] = None,
-        db: Session = Depends(get_db)
+        continent: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        has_ekuz: Optional[bool] = None,
+        visa_required: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Get list of all countries with basic info"""
-    countries = crud.get_countries(db, skip=skip, limit=limit, region=region)
-    return countries
+    """
+    Get list of all countries with basic info.
+    Pass the X-Next-Cursor header of the previous page as `cursor` to paginate.
+    """
+    after = None
+    if cursor:
+        try:
+            after = crud.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    filters = dict(region=region, continent=continent, risk_level=risk_level,
+                   has_ekuz=has_ekuz, visa_required=visa_required)
+    await response_cache.refresh(db)
+    key = list_key(skip=None if after else skip, limit=limit, after=after, **filters)
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        countries = await crud.get_countries(db, skip=skip, limit=limit, after=after, **filters)
+        entry = serialize_country_list(countries, limit)
+        response_cache.set(key, entry, version)
+    return cached_response(request, key, entry)
+
+@router.get("/batch", response_model=List[schemas.CountryDetail],
+            responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+async def get_countries_batch(
+        request: Request,
+        iso: str,
+        fields: Optional[str] = None,
+        include: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get detailed info for several countries at once (?iso=PL,DE,THA), in request order.
+    Supports the same `fields` / `include` selection as the single country endpoint.
+    """
+    codes = list(dict.fromkeys(c.strip().upper() for c in iso.split(",") if c.strip()))
+    if not codes or len(codes) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {MAX_BATCH_SIZE} ISO codes")
+    if any(len(c) not in (2, 3) for c in codes):
+        raise HTTPException(status_code=400, detail="Invalid ISO code")
 
-@router.get("/{iso_code}", response_model=schemas.CountryDetail)
-def get_country(iso_code: str, db: Session = Depends(get_db)):
-    """Get detailed info for specific country (2 or 3 letter ISO code)"""
+    try:
+        selection = schemas.parse_country_fields(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await response_cache.refresh(db)
+    entries = {code: response_cache.get(detail_key(code, selection)) for code in codes}
+    misses = [code for code, entry in entries.items() if entry is None]
+    if misses:
+        version = response_cache.version
+        for country in await crud.get_countries_by_iso(db, misses, selection):
+            entry = serialize_country_detail(country, selection)
+            for code in (country.iso_alpha2, country.iso_alpha3):
+                response_cache.set(detail_key(code, selection), entry, version)
+                if code in entries:
+                    entries[code] = entry
+
+    not_found = [code for code, entry in entries.items() if entry is None]
+    if not_found:
+        raise HTTPException(status_code=404, detail=f"Countries not found: {', '.join(not_found)}")
+
+    key = "batch:" + ",".join(codes) + (f"?{selection.key}" if selection is not None else "")
+    return cached_response(request, key, combine_country_details(list(entries.values())))
+
+@router.get("/{iso_code}", response_model=schemas.CountryDetail,
+            responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+async def get_country(
+        iso_code: str,
+        request: Request,
+        fields: Optional[str] = None,
+        include: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get detailed info for specific country (2 or 3 letter ISO code).
+    `fields` (comma separated) limits the returned keys, `include` adds
+    relationships (e.g. ?fields=name_pl&include=safety,weather).
+    Relationships that are not requested are neither queried nor serialized.
+    """
     iso_code = iso_code.upper()
 
-    if len(iso_code) == 2:
-        country = crud.get_country_by_iso2(db, iso_code)
-    elif len(iso_code) == 3:
-        country = crud.get_country_by_iso3(db, iso_code)
-    else:
+    if len(iso_code) not in (2, 3):
         raise HTTPException(status_code=400, detail="Invalid ISO code")
 
-    if not country:
-        raise HTTPException(status_code=404, detail="Country not found")
+    try:
+        selection = schemas.parse_country_fields(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await response_cache.refresh(db)
+    key = detail_key(iso_code, selection)
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        if len(iso_code) == 2:
+            country = await crud.get_country_by_iso2(db, iso_code, selection)
+        else:
+            country = await crud.get_country_by_iso3(db, iso_code, selection)
+
+        if not country:
+            raise HTTPException(status_code=404, detail="Country not found")
+
+        entry = serialize_country_detail(country, selection)
+        response_cache.set(key, entry, version)
 
-    return country
+    return cached_response(request, key, entry)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ...database import get_async_db
+from ... import schemas, search as search_index
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.SearchResultSchema])
+async def search(
+        q: str = Query(..., min_length=2, max_length=200),
+        kind: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over country summaries, attractions, UNESCO sites, laws and practical info"""
+    if kind and kind not in search_index.SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(search_index.SEARCH_KINDS)}")
+    if not await db.run_sync(search_index.is_supported):
+        raise HTTPException(status_code=501, detail="Search requires the SQLite database")
+    return await db.run_sync(search_index.search, q, kind=kind, limit=limit)
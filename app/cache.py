@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from . import models, schemas, crud
+
+logger = logging.getLogger("uvicorn")
+
+# How often (seconds) the API re-reads the data version written by sync runs
+VERSION_CHECK_INTERVAL = float(os.environ.get("RESPONSE_CACHE_CHECK_INTERVAL", "5"))
+# Upper bound on cached responses (sparse fieldsets can produce many variants)
+MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+async def get_data_version(db: AsyncSession) -> int:
+    row = await db.get(models.DataVersion, 1, populate_existing=True)
+    return row.version if row else 0
+
+def bump_data_version(db: Session) -> int:
+    """Mark country data as changed. Called at the end of every sync."""
+    row = db.query(models.DataVersion).get(1)
+    if not row:
+        row = models.DataVersion(id=1, version=0)
+        db.add(row)
+    row.version = (row.version or 0) + 1
+    row.updated_at = func.now()
+    db.commit()
+    response_cache.invalidate(row.version)
+    return row.version
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    surrogate_keys: str
+    next_cursor: Optional[str] = None
+
+class ResponseCache:
+    """
+    In-process cache of serialized API responses (JSON bytes + validators).
+    Entries belong to a single data version and are dropped as soon as sync bumps it.
+    """
+    def __init__(self, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self._entries: Dict[str, CachedResponse] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, version: Optional[int] = None):
+        with self._lock:
+            self._entries = {}
+            self.version = version
+            self._checked_at = time.monotonic() if version is not None else 0.0
+
+    async def refresh(self, db: AsyncSession):
+        """Re-read the data version at most once per check_interval."""
+        now = time.monotonic()
+        if self.version is not None and now - self._checked_at < self.check_interval:
+            return
+        version = await get_data_version(db)
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    logger.info(f"Data version changed {self.version} -> {version}, dropping response cache")
+                self._entries = {}
+                self.version = version
+            self._checked_at = now
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: CachedResponse, version: Optional[int] = None):
+        # Skip results computed against a version that has since been replaced
+        if version is not None and version != self.version:
+            return
+        if len(self._entries) >= MAX_ENTRIES and key not in self._entries:
+            return
+        self._entries[key] = entry
+
+    async def warm(self, db: AsyncSession) -> int:
+        """Serialize every country detail up front so reads are a dict lookup."""
+        await self.refresh(db)
+        version = self.version
+        countries = await crud.get_all_country_details(db)
+        for country in countries:
+            entry = serialize_country_detail(country)
+            self.set(detail_key(country.iso_alpha2), entry, version)
+            self.set(detail_key(country.iso_alpha3), entry, version)
+        logger.info(f"Response cache warmed with {len(countries)} countries (data version {version})")
+        return len(countries)
+
+def detail_key(iso_code: str, selection: Optional[schemas.CountryFieldSelection] = None) -> str:
+    key = f"detail:{iso_code.upper()}"
+    return f"{key}?{selection.key}" if selection is not None else key
+
+def list_key(**params) -> str:
+    return "list:" + "&".join(f"{k}={v}" for k, v in sorted(params.items()) if v is not None)
+
+def surrogate_key(iso2: str) -> str:
+    """CDN surrogate key for one country, purge it after a targeted re-sync"""
+    return f"country-{iso2.upper()}"
+
+def _stamp(value) -> str:
+    return value.isoformat() if value else "-"
+
+def country_etag(country: models.Country, selection: Optional[schemas.CountryFieldSelection] = None) -> str:
+    """
+    Strong ETag for a CountryDetail built from Country.updated_at and the
+    row count + newest last_updated of every relationship in the response.
+    """
+    parts = [country.iso_alpha2, _stamp(country.updated_at)]
+    relations = schemas.COUNTRY_DETAIL_RELATIONS
+    if selection is not None:
+        # Different representations of the same country need different strong ETags
+        parts.append(selection.key)
+        relations = [r for r in relations if r in selection.relations]
+    for name in relations:
+        value = getattr(country, name)
+        rows = value if isinstance(value, list) else ([value] if value is not None else [])
+        stamps = [getattr(r, "last_updated", None) or getattr(r, "last_checked", None) for r in rows]
+        if name == "currency" and value is not None:
+            stamps += [d.last_updated for d in value.denominations]
+            rows = rows + list(value.denominations)
+        parts.append(f"{name}:{len(rows)}:{_stamp(max(filter(None, stamps), default=None))}")
+    return '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+
+def countries_etag(countries: List[models.Country]) -> str:
+    parts = [f"{c.iso_alpha2}:{_stamp(c.updated_at)}" for c in countries]
+    return '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+
+def serialize_country_detail(country: models.Country, selection: Optional[schemas.CountryFieldSelection] = None) -> CachedResponse:
+    schema = schemas.CountryDetail if selection is None else schemas.country_detail_subset(selection.fields)
+    body = schema.model_validate(country).model_dump_json().encode("utf-8")
+    return CachedResponse(body, country_etag(country, selection), f"countries {surrogate_key(country.iso_alpha2)}")
+
+def combine_country_details(entries: List[CachedResponse]) -> CachedResponse:
+    """JSON array of already serialized country details (batch endpoint)"""
+    body = b"[" + b",".join(e.body for e in entries) + b"]"
+    etag = '"' + hashlib.sha1("|".join(e.etag for e in entries).encode("utf-8")).hexdigest() + '"'
+    keys = dict.fromkeys(k for e in entries for k in e.surrogate_keys.split())
+    return CachedResponse(body, etag, " ".join(keys))
+
+_COUNTRY_LIST_ADAPTER = TypeAdapter(List[schemas.CountryBasic])
+
+def serialize_country_list(countries: List[models.Country], limit: Optional[int] = None) -> CachedResponse:
+    body = _COUNTRY_LIST_ADAPTER.dump_json(_COUNTRY_LIST_ADAPTER.validate_python(countries))
+    # A full page means there may be more rows after the last country
+    next_cursor = crud.encode_cursor(countries[-1].iso_alpha2) if countries and limit and len(countries) >= limit else None
+    return CachedResponse(body, countries_etag(countries), "countries country-list", next_cursor)
+
+response_cache = ResponseCache()
@@ -0,0 +1,125 @@
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload, load_only, raiseload
+from typing import List, Optional
+import base64
+import binascii
+from . import models, schemas
+
+# Eager-loading plan for schemas.CountryDetail, one loader per relationship.
+# Scalar (uselist=False) relations are joined into the main query, collections are
+# fetched with one SELECT ... IN per relationship, so a detail read costs a fixed
+# number of queries regardless of how many rows each relation holds.
+COUNTRY_RELATION_LOADERS = {
+    "currency": joinedload(models.Country.currency).selectinload(models.Currency.denominations),
+    "safety": joinedload(models.Country.safety),
+    "practical": joinedload(models.Country.practical),
+    "costs": joinedload(models.Country.costs),
+    "weather": joinedload(models.Country.weather),
+    "languages": selectinload(models.Country.languages),
+    "embassies": selectinload(models.Country.embassies),
+    "attractions": selectinload(models.Country.attractions),
+    "unesco_places": selectinload(models.Country.unesco_places),
+    "souvenirs": selectinload(models.Country.souvenirs),
+    "religions": selectinload(models.Country.religions),
+    "holidays": selectinload(models.Country.holidays),
+    "laws_and_customs": selectinload(models.Country.laws_and_customs),
+}
+COUNTRY_DETAIL_OPTIONS = tuple(COUNTRY_RELATION_LOADERS.values())
+
+def country_detail_options(selection: Optional[schemas.CountryFieldSelection] = None):
+    """
+    Loader options for a (possibly sparse) CountryDetail. Unselected columns are
+    deferred and unselected relationships raise instead of lazy loading.
+    """
+    if selection is None:
+        return COUNTRY_DETAIL_OPTIONS
+    # ISO codes and updated_at are always needed for cache keys and ETags
+    columns = {"id", "iso_alpha2", "iso_alpha3", "updated_at", *selection.columns}
+    return (
+        load_only(*[getattr(models.Country, c) for c in columns]),
+        *[COUNTRY_RELATION_LOADERS[r] for r in selection.relations],
+        raiseload("*"),
+    )
+
+def encode_cursor(iso2: str) -> str:
+    """Opaque keyset cursor pointing just after the given country"""
+    return base64.urlsafe_b64encode(iso2.encode("ascii")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        iso2 = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if len(iso2) != 2 or not iso2.isalpha():
+        raise ValueError("Invalid cursor")
+    return iso2.upper()
+
+def countries_query(
+        skip: int = 0,
+        limit: int = 100,
+        region: Optional[str] = None,
+        continent: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        has_ekuz: Optional[bool] = None,
+        visa_required: Optional[bool] = None,
+        after: Optional[str] = None
+):
+    """
+    Country list statement for schemas.CountryBasic (no relationships are touched).
+    Ordered by iso_alpha2; pass `after` (last iso_alpha2 seen) for keyset
+    pagination, `skip` is only applied when no cursor is given.
+    """
+    query = select(models.Country)
+    if region:
+        query = query.where(models.Country.region == region)
+    if continent:
+        query = query.where(models.Country.continent == continent)
+    if has_ekuz is not None:
+        query = query.where(models.Country.has_ekuz == has_ekuz)
+    # Child-table filters as IN subqueries so SQLite drives them from the composite indexes
+    if risk_level:
+        query = query.where(models.Country.id.in_(
+            select(models.SafetyInfo.country_id).where(models.SafetyInfo.risk_level == risk_level)
+        ))
+    if visa_required is not None:
+        query = query.where(models.Country.id.in_(
+            select(models.EntryRequirement.country_id).where(models.EntryRequirement.visa_required == visa_required)
+        ))
+
+    query = query.order_by(models.Country.iso_alpha2)
+    if after:
+        query = query.where(models.Country.iso_alpha2 > after)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def country_detail_query(selection: Optional[schemas.CountryFieldSelection] = None):
+    # Joined eager loads can repeat a country row, read results with .unique()
+    return select(models.Country).options(*country_detail_options(selection))
+
+async def get_countries(db: AsyncSession, skip: int = 0, limit: int = 100, **filters) -> List[models.Country]:
+    result = await db.execute(countries_query(skip=skip, limit=limit, **filters))
+    return result.scalars().all()
+
+async def get_country_by_iso2(db: AsyncSession, iso2: str, selection: Optional[schemas.CountryFieldSelection] = None) -> Optional[models.Country]:
+    result = await db.execute(country_detail_query(selection).where(models.Country.iso_alpha2 == iso2.upper()))
+    return result.scalars().unique().first()
+
+async def get_country_by_iso3(db: AsyncSession, iso3: str, selection: Optional[schemas.CountryFieldSelection] = None) -> Optional[models.Country]:
+    result = await db.execute(country_detail_query(selection).where(models.Country.iso_alpha3 == iso3.upper()))
+    return result.scalars().unique().first()
+
+async def get_countries_by_iso(db: AsyncSession, iso_codes: List[str], selection: Optional[schemas.CountryFieldSelection] = None) -> List[models.Country]:
+    """Several country details (2 or 3 letter codes) with a single set of eager-loading queries"""
+    iso2 = [c.upper() for c in iso_codes if len(c) == 2]
+    iso3 = [c.upper() for c in iso_codes if len(c) == 3]
+    result = await db.execute(country_detail_query(selection).where(
+        or_(models.Country.iso_alpha2.in_(iso2), models.Country.iso_alpha3.in_(iso3))
+    ))
+    return result.scalars().unique().all()
+
+async def get_all_country_details(db: AsyncSession) -> List[models.Country]:
+    """All countries with the CountryDetail plan, e.g. for warming the response cache"""
+    result = await db.execute(country_detail_query().order_by(models.Country.iso_alpha2))
+    return result.scalars().unique().all()
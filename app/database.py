@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, delete, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, raiseload, sessionmaker
 import os
+from .metrics import instrument_engine
 
 # Lokalna baza SQLite
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./travel_cheatsheet.db")
@@ -11,11 +13,87 @@ engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def async_database_url(url: str) -> str:
+    """Same database through an asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+# Asynchroniczny dostęp dla endpointów i scraperów - I/O bazy nie blokuje pętli zdarzeń.
+# expire_on_commit=False: po commit atrybuty nie są przeładowywane (lazy load nie działa w asyncio)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Statement counts, timings and the slow-query log for both engines (API, admin jobs, sync_all.py)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Tryb testowy: relacje niezaładowane jawnie (selectinload/joinedload) rzucają wyjątek
+# zamiast wykonywać osobne zapytanie dla każdego obiektu (N+1)
+STRICT_LOADING = os.environ.get("DB_STRICT_LOADING", "0") == "1"
+
+def _raise_on_lazy_load(orm_execute_state):
+    """Equivalent of lazy="raise_on_sql" on every relationship not eager-loaded by the query"""
+    if orm_execute_state.is_select and not orm_execute_state.is_column_load and not orm_execute_state.is_relationship_load:
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*", sql_only=True))
+
+if STRICT_LOADING:
+    # Session class covers SessionLocal and the sync sessions behind AsyncSession
+    event.listen(Session, "do_orm_execute", _raise_on_lazy_load)
+
 Base = declarative_base()
 
+def create_missing_indexes(bind=None):
+    """create_all() skips indexes of tables that already exist, so add new ones here"""
+    bind = bind or engine
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            # Older database files may still miss columns added to the models
+            if index.name in existing or not all(c.name in columns for c in index.columns):
+                continue
+            if index.unique and "id" in table.c:
+                _delete_duplicates(bind, table, index)
+            index.create(bind=bind)
+
+def _delete_duplicates(bind, table, index):
+    """Keep the newest row per key so a unique index can be added to an existing table"""
+    keep = select(func.max(table.c.id)).group_by(*index.columns)
+    # NULLs never collide in a unique index, rows with one are kept
+    stmt = delete(table).where(*(c.isnot(None) for c in index.columns), table.c.id.notin_(keep))
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            conn.execute(stmt)
+    else:
+        bind.execute(stmt)
+
+async def init_schema():
+    """
+    Create missing tables and indexes. Run as an explicit startup step (not at import
+    time) so importing the app stays cheap; models must be imported before calling it.
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
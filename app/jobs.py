@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import Context, ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn")
+
+# Finished jobs kept for the status endpoints
+MAX_FINISHED_JOBS = 50
+# Errors kept per job (the counters still count all of them)
+MAX_JOB_ERRORS = 500
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+class Job:
+    """One admin sync run with per-country progress, filled in by BaseScraper"""
+    def __init__(self, name: str, params: Dict[str, Any], func: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.params = params
+        self.func = func
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # iso2 -> "pending" / "ok" / "error"
+        self.countries: Dict[str, str] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+
+    @property
+    def key(self) -> Tuple:
+        return (self.name, tuple(sorted(self.params.items())))
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def country_started(self, iso2: str):
+        self.countries.setdefault(iso2, "pending")
+
+    def country_finished(self, iso2: str, error: Optional[str] = None):
+        self.countries[iso2] = "error" if error else "ok"
+        if error:
+            self.error_count += 1
+            if len(self.errors) < MAX_JOB_ERRORS:
+                self.errors.append({"country": iso2, "error": error, "at": time.time()})
+
+    def progress(self) -> Dict[str, Any]:
+        done = sum(1 for s in self.countries.values() if s != "pending")
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "total": len(self.countries),
+            "done": done,
+            "ok": sum(1 for s in self.countries.values() if s == "ok"),
+            "errors": self.error_count,
+            "elapsed": round(elapsed, 1),
+            "countries_per_second": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def to_dict(self, detail: bool = False) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress(),
+            "error": self.error,
+        }
+        if detail:
+            data["countries"] = self.countries
+            data["errors"] = self.errors
+            data["result"] = self.result
+        return data
+
+# Job whose function is currently running (read by BaseScraper to report progress)
+current_job: ContextVar[Optional[Job]] = ContextVar("current_job", default=None)
+
+class JobRunner:
+    """
+    In-process queue for admin syncs. Jobs run one at a time in the API event loop;
+    submitting a job identical to a queued/running one returns the existing job.
+    State is per process, like the response cache.
+    """
+    def __init__(self):
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Tuple, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, name: str, func: Callable[[], Awaitable[Any]], **params) -> Tuple[Job, bool]:
+        """Enqueue a job, returns (job, created)"""
+        job = Job(name, params, func)
+        existing = self._active.get(job.key)
+        if existing:
+            return self.jobs[existing], False
+
+        self._ensure_worker()
+        self.jobs[job.id] = job
+        self._active[job.key] = job.id
+        self._queue.put_nowait(job)
+        self._prune()
+        logger.info(f"Job {job.id} queued: {name} {params or ''}")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            # Jobs of a previous (closed) loop can never finish
+            for job in self.jobs.values():
+                if not job.finished:
+                    job.status, job.error = FAILED, "Job runner restarted"
+            self._active.clear()
+            # Fresh context, the worker must not inherit request-scoped state of the first submit
+            self._worker = Context().run(loop.create_task, self._work())
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        token = current_job.set(job)
+        try:
+            job.result = await job.func()
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.name}) failed")
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            current_job.reset(token)
+            job.finished_at = time.time()
+            self._active.pop(job.key, None)
+            logger.info(f"Job {job.id} {job.status}: {job.progress()}")
+
+    def _prune(self):
+        finished = [j.id for j in self.jobs.values() if j.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+job_runner = JobRunner()
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import logging
@@ -12,19 +13,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger("uvicorn")
 
-from .database import engine
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from .database import AsyncSessionLocal, init_schema
 from . import models
+from .cache import response_cache
+from .search import ensure_search_index
+from .metrics import MetricsMiddleware
 from .api.api import api_router
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+# Schema check on startup; disable on workers when the database is migrated separately
+SCHEMA_CHECK = os.environ.get("API_SCHEMA_CHECK", "1") != "0"
 
 app = FastAPI(
     title="Travel Cheatsheet API",
     description="Polish travel information aggregator",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+app.add_middleware(MetricsMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +45,31 @@ app.add_middleware(
 # Include API Router
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def check_schema():
+    if SCHEMA_CHECK:
+        await init_schema()
+
+@app.on_event("startup")
+async def warm_caches():
+    async with AsyncSessionLocal() as db:
+        try:
+            await response_cache.warm(db)
+        except Exception as e:
+            logger.error(f"Response cache warm-up failed: {e}")
+        try:
+            await db.run_sync(ensure_search_index)
+        except Exception as e:
+            logger.error(f"Search index build failed: {e}")
+
+@app.on_event("shutdown")
+async def close_scraper_resources():
+    # Imported here: scrapers stay out of the API's import time (scripts/check_import_time.py)
+    from .scrapers.http_client import http_clients
+    from .scrapers.parse_pool import parse_pool
+    await http_clients.aclose()
+    parse_pool.shutdown()
+
 @app.get("/")
 def read_root():
     return {
@@ -45,10 +78,16 @@ def read_root():
         "endpoints": {
             "countries": "/api/countries",
             "country": "/api/countries/{iso_code}",
+            "search": "/api/search?q=...",
             "health": "/health"
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
@@ -0,0 +1,159 @@
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import urlsplit
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+
+logger = logging.getLogger("uvicorn")
+
+# Statements slower than this (ms) are logged with their parameters, 0 disables
+SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", "500"))
+# Test mode: fail a request / a scraper's sync_country call issuing more statements than this
+# (catches N+1 regressions), 0 disables
+MAX_QUERIES_PER_REQUEST = int(os.environ.get("DB_MAX_QUERIES_PER_REQUEST", "0"))
+MAX_QUERIES_PER_SCRAPE = int(os.environ.get("DB_MAX_QUERIES_PER_SCRAPE", "0"))
+
+# Prometheus metrics of the API process (requests, SQL) and of scrapers running in it
+# (admin jobs). sync_all.py runs in its own process and is not scraped.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served", ["method"])
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_QUERY_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ["route"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["operation"])
+DB_QUERY_TIME = Histogram(
+    "db_query_duration_seconds", "SQL statement duration", ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_ROWS_WRITTEN = Counter("db_rows_written_total", "Rows inserted/updated/deleted", ["table", "operation"])
+
+SCRAPER_REQUESTS = Counter("scraper_http_requests_total", "Outgoing scraper HTTP requests", ["host", "status"])
+SCRAPER_BYTES = Counter("scraper_http_bytes_total", "Bytes downloaded by scrapers (before decompression)", ["host"])
+SCRAPER_HOST_RATE = Gauge("scraper_host_rate", "Requests per second currently allowed per host", ["host"])
+SCRAPER_THROTTLED = Counter("scraper_throttled_seconds_total", "Time requests waited for the per-host rate limiter", ["host"])
+SCRAPER_RATE_LIMITED = Counter("scraper_http_429_total", "429 Too Many Requests responses", ["host"])
+SCRAPER_CIRCUIT_STATE = Gauge("scraper_circuit_state", "Circuit breaker per host (0 closed, 1 half-open, 2 open)", ["host"])
+SCRAPER_CIRCUIT_REJECTED = Counter("scraper_circuit_rejected_total", "Requests failed fast by an open circuit breaker", ["host"])
+SCRAPER_RETRIES = Counter("scraper_retries_total", "Retried scraper calls", ["scraper"])
+SCRAPER_RESULTS = Counter("scraper_country_results_total", "Per-country scraper outcomes", ["scraper", "result"])
+SCRAPER_QUERIES = Histogram(
+    "scraper_db_queries", "SQL statements executed per sync_country call", ["scraper"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+
+class QueryLimitExceeded(RuntimeError):
+    """Raised (in test mode) when a request or scraper call exceeds its statement budget"""
+
+class QueryStats:
+    """
+    SQL statements and time of one request or scraper call (mutated in place, so it
+    is visible across tasks). With a limit set, the statement over it raises.
+    """
+    __slots__ = ("label", "limit", "count", "duration")
+
+    def __init__(self, label: str = "", limit: int = 0):
+        self.label = label
+        self.limit = limit
+        self.count = 0
+        self.duration = 0.0
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_DML_TABLE = re.compile(r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|UPDATE|DELETE\s+FROM)\s+["`]?(\w+)', re.I)
+
+def _operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+def _short(value, width: int = 500) -> str:
+    text = " ".join(str(value).split())
+    return text if len(text) <= width else text[:width] + "..."
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is not None and stats.limit and stats.count >= stats.limit:
+        raise QueryLimitExceeded(
+            f"{stats.label} issued more than {stats.limit} SQL statements (N+1?), next: {_short(statement, 200)}"
+        )
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    operation = _operation(statement)
+    DB_QUERIES.labels(operation).inc()
+    DB_QUERY_TIME.labels(operation).observe(elapsed)
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        source = f" in {stats.label}" if stats is not None and stats.label else ""
+        logger.warning(f"Slow query ({elapsed * 1000:.0f} ms{source}): {_short(statement)} params={_short(parameters)}")
+
+    match = _DML_TABLE.match(statement)
+    if match and cursor.rowcount and cursor.rowcount > 0:
+        DB_ROWS_WRITTEN.labels(match.group(1), operation).inc(cursor.rowcount)
+
+def instrument_engine(engine):
+    """Attach query metrics to an Engine (pass async_engine.sync_engine for the async one)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and SQL per request by route template"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        stats = QueryStats(f"{method} {scope['path']}", MAX_QUERIES_PER_REQUEST)
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            current_query_stats.reset(token)
+            # Route template (e.g. /api/countries/{iso_code}) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(method, route, status["code"]).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(stats.count)
+            REQUEST_QUERY_TIME.labels(route).observe(stats.duration)
+
+async def _record_response(response):
+    host = urlsplit(str(response.request.url)).hostname or "unknown"
+    SCRAPER_REQUESTS.labels(host, response.status_code).inc()
+    if response.status_code == 429:
+        SCRAPER_RATE_LIMITED.labels(host).inc()
+
+# Pass as httpx.AsyncClient(event_hooks=...) to count scraper requests per host
+HTTPX_EVENT_HOOKS = {"response": [_record_response]}
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DECIMAL, TIMESTAMP, Text, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Boolean, DECIMAL, TIMESTAMP, Text, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
 class Country(Base):
     __tablename__ = "countries"
+    __table_args__ = (
+        # List filters + keyset pagination ordered by iso_alpha2
+        Index("ix_countries_continent_iso2", "continent", "iso_alpha2"),
+        Index("ix_countries_region_iso2", "region", "iso_alpha2"),
+        Index("ix_countries_has_ekuz_iso2", "has_ekuz", "iso_alpha2"),
+    )
 
     id = Column(Integer, primary_key=True)
     iso_alpha2 = Column(String(2), unique=True, nullable=False, index=True)
@@ -123,6 +129,7 @@ class CurrencyDenomination(Base):
 
 class SafetyInfo(Base):
     __tablename__ = "safety_info"
+    __table_args__ = (Index("ix_safety_info_risk_level_country", "risk_level", "country_id"),)
 
     id = Column(Integer, primary_key=True)
     country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), index=True)
@@ -153,6 +160,7 @@ class Embassy(Base):
 
 class EntryRequirement(Base):
     __tablename__ = "entry_requirements"
+    __table_args__ = (Index("ix_entry_requirements_visa_country", "visa_required", "country_id"),)
 
     id = Column(Integer, primary_key=True)
     country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), index=True)
@@ -185,6 +193,8 @@ class Attraction(Base):
 
 class UnescoPlace(Base):
     __tablename__ = "unesco_places"
+    # Natural key of the scraper upserts (app/scrapers/upsert.py)
+    __table_args__ = (Index("ux_unesco_places_country_unesco_id", "country_id", "unesco_id", unique=True),)
 
     id = Column(Integer, primary_key=True)
     country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), index=True)
@@ -226,6 +236,7 @@ class Souvenir(Base):
 
 class Holiday(Base):
     __tablename__ = "holidays"
+    __table_args__ = (Index("ux_holidays_country_date_name", "country_id", "date", "name", unique=True),)
 
     id = Column(Integer, primary_key=True)
     country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), index=True)
@@ -296,6 +307,7 @@ class Weather(Base):
 
 class Climate(Base):
     __tablename__ = "climate"
+    __table_args__ = (Index("ux_climate_country_month", "country_id", "month", unique=True),)
 
     id = Column(Integer, primary_key=True)
     country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), index=True)
@@ -337,3 +349,31 @@ class CostOfLiving(Base):
     last_updated = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     country = relationship("Country", back_populates="costs")
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class SourceHash(Base):
+    """Hash of the data last written by a scraper (source) for a country, to skip identical rewrites"""
+    __tablename__ = "source_hashes"
+    __table_args__ = (Index("ux_source_hashes_country_source", "country_id", "source", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    country_id = Column(Integer, ForeignKey("countries.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String(50), nullable=False)
+    hash = Column(String(64), nullable=False)
+    last_updated = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class Translation(Base):
+    """Translation memory of translate_to_pl; manual rows override machine translations"""
+    __tablename__ = "translations"
+
+    id = Column(Integer, primary_key=True)
+    source_text = Column(String(500), unique=True, nullable=False)
+    translated = Column(String(500))
+    is_manual = Column(Boolean, default=False, nullable=False)
+    last_updated = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, field_validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, create_model, field_validator
+from typing import List, Optional, Dict, Any, FrozenSet, NamedTuple, Type
 from datetime import datetime, date
+from functools import lru_cache
 import json
 
 class LanguageSchema(BaseModel):
@@ -518,3 +519,57 @@ class CountryExportSchema(BaseModel):
         from_attributes = True
 
 CountryDetail.model_rebuild()
+
+class SearchResultSchema(BaseModel):
+    kind: str  # country, attraction, unesco, law, practical
+    iso2: str
+    title: Optional[str]
+    snippet: str  # matches wrapped in <b></b>
+    score: float
+
+# Relationship fields of CountryDetail (same names as on models.Country)
+COUNTRY_DETAIL_RELATIONS = (
+    "languages", "currency", "safety", "embassies", "attractions", "unesco_places",
+    "souvenirs", "religions", "holidays", "weather", "practical", "laws_and_customs", "costs",
+)
+
+class CountryFieldSelection(NamedTuple):
+    """Sparse fieldset for CountryDetail: scalar Country columns + relationships to load"""
+    columns: FrozenSet[str]
+    relations: FrozenSet[str]
+
+    @property
+    def fields(self) -> FrozenSet[str]:
+        return self.columns | self.relations
+
+    @property
+    def key(self) -> str:
+        return ",".join(sorted(self.fields))
+
+def parse_country_fields(fields: Optional[str], include: Optional[str]) -> Optional[CountryFieldSelection]:
+    """
+    Parse ?fields= and ?include= into a selection (None means the full document).
+    `fields` limits the top-level keys, `include` adds relationships to them.
+    """
+    requested = {f.strip() for f in (fields or "").split(",") if f.strip()}
+    included = {f.strip() for f in (include or "").split(",") if f.strip()}
+    if not requested and not included:
+        return None
+
+    relations = set(COUNTRY_DETAIL_RELATIONS)
+    scalars = set(CountryDetail.model_fields) - relations
+    unknown = (requested - scalars - relations) | (included - relations)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    columns = requested & scalars if requested else scalars
+    return CountryFieldSelection(frozenset(columns), frozenset(included | (requested & relations)))
+
+@lru_cache(maxsize=256)
+def country_detail_subset(fields: FrozenSet[str]) -> Type[BaseModel]:
+    """CountryDetail restricted to the given top-level fields"""
+    return create_model(
+        "CountryDetailSubset",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in CountryDetail.model_fields.items() if name in fields}
+    )
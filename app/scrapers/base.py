@@ -1,36 +1,112 @@
 import asyncio
+import inspect
 import logging
+import os
 import httpx
 import random
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from abc import ABC, abstractmethod
-from typing import List, Any, Dict, Optional, Type, List, Dict
+from sqlalchemy.sql.expression import ClauseElement
+from typing import List, Any, Awaitable, Callable, Dict, Optional, Tuple, Type, Union
 from .. import models
+from ..jobs import current_job
+from ..metrics import (
+    MAX_QUERIES_PER_SCRAPE, SCRAPER_QUERIES, SCRAPER_RETRIES, SCRAPER_RESULTS,
+    QueryStats, current_query_stats,
+)
+from .content_hash import changed_hash, save_hash
+from .http_client import HTTPClient, http_clients
+from .pipeline import AfterCommit, ReplaceRows, Result, SetFields
+from .upsert import replace_rows
 from .utils import get_headers
 
 logger = logging.getLogger("uvicorn")
 
-class BaseScraper(ABC):
+# Countries waiting between pipeline stages, bounds memory while fetchers run ahead
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "50"))
+# Countries written per transaction by the pipeline writer
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "25"))
+_DONE = object()
+
+def session_lock(db: AsyncSession) -> asyncio.Lock:
+    """Lock serializing operations of all scrapers sharing one AsyncSession"""
+    return db.info.setdefault("scraper_lock", asyncio.Lock())
+
+async def load_countries(db: AsyncSession, *options) -> List[models.Country]:
+    """All countries for a scraper run. Relationships used by sync_country must be
+    passed as loader options, lazy loading is not available on an AsyncSession."""
+    async with session_lock(db):
+        result = await db.execute(select(models.Country).options(*options))
+    return result.scalars().all()
+
+class BaseScraper:
     """
     Base class for all scrapers to provide unified concurrency control, 
     error handling, retry logic, and database session management.
+
+    The session is an AsyncSession, so database I/O does not stall the HTTP
+    fetches of other countries. An AsyncSession allows only one operation at a
+    time, so every query/commit goes through the helpers below, which serialize
+    them on a lock shared by all scrapers using the same session.
+
+    Scrapers either implement sync_country() (fetch, parse and write one country), or
+    only fetch() and parse() and let run() drive the pipeline: concurrent fetchers
+    feed parsers through a bounded queue, and a single writer task applies the
+    parsed write operations (pipeline.py) in batched transactions.
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 30.0, max_retries: int = 3):
+    # Parser tasks of the pipeline
+    parse_workers = 1
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Checked when the class is defined, like an abstract method (both ways have defaults here)
+        if cls.fetch is BaseScraper.fetch and cls.sync_country is BaseScraper.sync_country:
+            raise TypeError(f"{cls.__name__} must implement sync_country() or fetch() and parse()")
+        if cls.fetch is not BaseScraper.fetch and cls.parse is BaseScraper.parse:
+            raise TypeError(f"{cls.__name__} implements fetch() but not parse()")
+
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 30.0, max_retries: int = 3):
         self.db = db
+        self.db_lock = session_lock(db)
         self.semaphore = asyncio.Semaphore(concurrency)
         self.timeout = timeout
         self.max_retries = max_retries
-        self.client: Optional[httpx.AsyncClient] = None
-        # Optional per-request delay to help with rate limiting
-        self.rate_limit_delay = 0.2 
+        # Request pacing is done per host by the shared clients' rate limiters
+        self.client: Optional[HTTPClient] = None
+
+    async def fetch(self, country: models.Country) -> Any:
+        """
+        Download what parse() needs for the country, or return a Result to finish it
+        without writes. HTTP errors raised here are retried with backoff.
+        """
+        raise NotImplementedError
+
+    def parse(self, country: models.Country, raw: Any) -> Union[List[Any], Result]:
+        """Write operations for the fetched payload (may also be a coroutine function)"""
+        raise NotImplementedError
+
+    def before_commit(self, session: Session):
+        """Called in every write transaction of the pipeline, before the commit"""
+
+    def after_commit(self):
+        """Called once a write transaction of the pipeline is committed"""
+
+    @property
+    def pipelined(self) -> bool:
+        return type(self).fetch is not BaseScraper.fetch
 
-    @abstractmethod
     async def sync_country(self, country: models.Country) -> Any:
         """
-        Logic to sync data for a single country. 
-        Must be implemented by subclasses.
+        Logic to sync data for a single country. Scrapers without fetch()/parse()
+        must implement it; for pipelined ones it runs the stages for one country.
         """
-        pass
+        if not self.pipelined:
+            raise NotImplementedError
+        fetched = await self._retrying(country, self._fetch_with_fallback)
+        if isinstance(fetched, dict):
+            return fetched
+        return (await self._write_batch([await self._parse(*fetched)]))[0]
 
     async def run(self, countries: List[models.Country]) -> Dict[str, int]:
         """
@@ -38,12 +114,11 @@ class BaseScraper(ABC):
         """
         results = {"success": 0, "errors": 0}
         
-        async with httpx.AsyncClient(
-            timeout=self.timeout, 
-            follow_redirects=True,
-            headers=get_headers()
-        ) as client:
-            self.client = client
+        # Pooled connections shared with other scrapers (see http_client.py)
+        self.client = http_clients.client(self.timeout, get_headers())
+        if self.pipelined:
+            await self._run_pipeline(countries, results)
+        else:
             tasks = [self._limited_sync(country, results) for country in countries]
             await asyncio.gather(*tasks)
             
@@ -53,65 +128,306 @@ class BaseScraper(ABC):
         """
         Internal wrapper to enforce concurrency limits and handle exceptions with retries.
         """
+        self._started(country)
         async with self.semaphore:
-            attempt = 0
-            while attempt <= self.max_retries:
+            res = await self._retrying(country, self._counted_sync)
+        self._record(country.iso_alpha2, res, results)
+
+    async def _retrying(self, country: models.Country, call: Callable[[models.Country], Awaitable[Any]]) -> Any:
+        """
+        call(country) retried with exponential backoff on HTTP errors and 429 results.
+        Other exceptions and exhausted retries are returned as {"error": ...}.
+        """
+        attempt = 0
+        while True:
+            try:
+                res = await call(country)
+                # Handle specific rate limiting codes
+                if isinstance(res, dict) and "error" in res:
+                    error_msg = str(res['error'])
+                    if "429" in error_msg or "too many requests" in error_msg.lower():
+                        raise httpx.HTTPStatusError("Rate limited (429)", request=None, response=None)
+                return res
+
+            except (httpx.RequestError, httpx.HTTPStatusError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    return {"error": f"Failed after {self.max_retries} retries: {e}"}
+                SCRAPER_RETRIES.labels(type(self).__name__).inc()
+                
+                # Exponential backoff with jitter
+                wait_time = (2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"Retry {attempt}/{self.max_retries} for {country.iso_alpha2} due to: {str(e)}. Waiting {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+                
+            except Exception as e:
+                return {"error": f"{type(e).__name__}: {e}"}
+
+    def _started(self, country: models.Country):
+        # Progress of the admin job running this scraper, if any
+        job = current_job.get()
+        if job:
+            job.country_started(country.iso_alpha2)
+
+    def _record(self, iso2: str, res: Any, results: Dict[str, int]):
+        """Count the outcome of a country in results, metrics and the admin job"""
+        job = current_job.get()
+        if isinstance(res, dict) and "error" in res:
+            error_msg = str(res['error'])
+            logger.error(f"Sync error for {iso2}: {error_msg}")
+            results["errors"] += 1
+            SCRAPER_RESULTS.labels(type(self).__name__, "error").inc()
+            if job: job.country_finished(iso2, error_msg)
+        else:
+            results["success"] += 1
+            # Page or data not modified since the last successful sync
+            unchanged = isinstance(res, dict) and res.get("status") == "unchanged"
+            if unchanged:
+                results["unchanged"] = results.get("unchanged", 0) + 1
+            SCRAPER_RESULTS.labels(type(self).__name__, "unchanged" if unchanged else "success").inc()
+            if job: job.country_finished(iso2)
+
+    async def _counted_sync(self, country: models.Country) -> Any:
+        """
+        sync_country with its SQL statements counted (and limited in test mode).
+        Commits flush whatever other countries left pending in the shared session,
+        so counts are approximate under concurrency.
+        """
+        name = type(self).__name__
+        stats = QueryStats(f"{name}.sync_country({country.iso_alpha2})", MAX_QUERIES_PER_SCRAPE)
+        token = current_query_stats.set(stats)
+        try:
+            return await self.sync_country(country)
+        finally:
+            current_query_stats.reset(token)
+            SCRAPER_QUERIES.labels(name).observe(stats.count)
+            logger.debug(f"{stats.label}: {stats.count} queries, {stats.duration * 1000:.0f} ms")
+
+    # --- Pipeline ---
+
+    async def _run_pipeline(self, countries: List[models.Country], results: Dict[str, int]):
+        fetched: asyncio.Queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        parsed: asyncio.Queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        parsers = [asyncio.create_task(self._parser(fetched, parsed)) for _ in range(self.parse_workers)]
+        writer = asyncio.create_task(self._writer(parsed, results))
+        try:
+            await asyncio.gather(*(self._fetcher(country, fetched, results) for country in countries))
+            for _ in parsers:
+                await fetched.put(_DONE)
+            await asyncio.gather(*parsers)
+            await parsed.put(_DONE)
+            await writer
+        finally:
+            # Only still running when the run itself failed or was cancelled
+            for task in (*parsers, writer):
+                task.cancel()
+
+    async def _fetcher(self, country: models.Country, queue: asyncio.Queue, results: Dict[str, int]):
+        self._started(country)
+        async with self.semaphore:
+            res = await self._retrying(country, self._fetch_with_fallback)
+        if isinstance(res, dict):
+            self._record(country.iso_alpha2, res, results)
+        else:
+            await queue.put(res)
+
+    async def _fetch_with_fallback(self, country: models.Country) -> Any:
+        """(country, target, payload) or an outcome dict; target is the parent when the country has no page"""
+        raw = await self.fetch(country)
+        if isinstance(raw, Result) and raw.not_found and country.parent_id:
+            async with self.db_lock:
+                parent = await self.db.get(models.Country, country.parent_id)
+            if parent:
+                logger.info(f"Falling back: {country.iso_alpha2} -> {parent.iso_alpha2}")
+                target, raw = parent, await self.fetch(parent)
+                if not isinstance(raw, Result):
+                    return country, target, raw
+        if isinstance(raw, Result):
+            return raw.to_dict()
+        return country, country, raw
+
+    async def _parse(self, country: models.Country, target: models.Country, raw: Any) -> Tuple:
+        """Pipeline item for the writer: (iso2, target id, operations or outcome dict)"""
+        try:
+            ops = self.parse(target, raw)
+            if inspect.isawaitable(ops):
+                ops = await ops
+        except Exception as e:
+            logger.debug(f"Parse error for {country.iso_alpha2}", exc_info=True)
+            ops = Result(error=f"Parse error: {type(e).__name__}: {e}")
+        if isinstance(ops, Result):
+            ops = ops.to_dict()
+        return country.iso_alpha2, target.id, ops
+
+    async def _parser(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            await outbox.put(await self._parse(*item))
+
+    async def _writer(self, queue: asyncio.Queue, results: Dict[str, int]):
+        """The only task writing for this run: one transaction per batch of countries"""
+        batch = []
+        while True:
+            item = await queue.get()
+            if item is not _DONE:
+                batch.append(item)
+            # Batches grow while parsed countries queue up, a lone country is not held back
+            if batch and (item is _DONE or len(batch) >= WRITE_BATCH_SIZE or queue.empty()):
                 try:
-                    res = await self.sync_country(country)
-                    
-                    if isinstance(res, dict) and "error" in res:
-                        error_msg = str(res['error'])
-                        
-                        # Handle specific rate limiting codes
-                        if "429" in error_msg or "too many requests" in error_msg.lower():
-                            raise httpx.HTTPStatusError("Rate limited (429)", request=None, response=None)
-                            
-                        logger.error(f"Sync error for {country.iso_alpha2}: {error_msg}")
-                        results["errors"] += 1
-                        return # Permanent error for this country
+                    outcomes = await self._write_batch(batch)
+                except Exception as e:
+                    # The writer must keep draining the queue, or the fetchers would block
+                    logger.exception(f"{type(self).__name__}: writing {len(batch)} countries failed")
+                    outcomes = [{"error": f"Write error: {type(e).__name__}: {e}"}] * len(batch)
+                for (iso2, _, _), res in zip(batch, outcomes):
+                    self._record(iso2, res, results)
+                batch = []
+            if item is _DONE:
+                return
+
+    async def _write_batch(self, batch: List[Tuple]) -> List[Any]:
+        """
+        Apply the operations of a batch in one transaction and return the outcomes.
+        When the transaction fails, the countries are retried one per transaction so
+        a single bad row only fails its own country.
+        """
+        name = type(self).__name__
+        writes = [item for item in batch if not isinstance(item[2], dict)]
+        if not writes:
+            return [item[2] for item in batch]
+        stats = QueryStats(f"{name}.write({len(writes)} countries)", MAX_QUERIES_PER_SCRAPE * len(writes))
+        token = current_query_stats.set(stats)
+        callbacks = []
+        try:
+            async with self.db_lock:
+                try:
+                    # A failed batch only rolls back its savepoint: a full rollback would expire
+                    # every object of the shared session, including other scrapers' ones
+                    async with self.db.begin_nested():
+                        rows = await self._prefetch(writes)
+                        statuses = [await self._apply(target_id, ops, callbacks, rows) for _, target_id, ops in writes]
+                        await self.db.run_sync(self.before_commit)
+                    await self._commit_or_rollback()
+                except Exception as e:
+                    callbacks = []
+                    if len(writes) == 1:
+                        statuses = [{"error": f"Write error: {type(e).__name__}: {e}"}]
                     else:
-                        results["success"] += 1
-                        return # Success!
-                        
-                except (httpx.RequestError, httpx.HTTPStatusError) as e:
-                    attempt += 1
-                    if attempt > self.max_retries:
-                        logger.error(f"Failed {country.iso_alpha2} after {self.max_retries} retries: {str(e)}")
-                        results["errors"] += 1
-                        return
-                    
-                    # Exponential backoff with jitter
-                    wait_time = (2 ** attempt) + random.uniform(0, 1)
-                    logger.warning(f"Retry {attempt}/{self.max_retries} for {country.iso_alpha2} due to: {str(e)}. Waiting {wait_time:.1f}s")
-                    await asyncio.sleep(wait_time)
-                    
+                        statuses = None
+        finally:
+            current_query_stats.reset(token)
+            for _ in writes:
+                SCRAPER_QUERIES.labels(name).observe(stats.count / len(writes))
+        if statuses is None:
+            logger.warning(f"{name}: batch of {len(writes)} countries failed, writing them one by one")
+            statuses = [(await self._write_batch([item]))[0] for item in writes]
+        else:
+            self.after_commit()
+            for callback in callbacks:
+                try:
+                    callback()
                 except Exception as e:
-                    logger.error(f"Unexpected exception for {country.iso_alpha2}: {type(e).__name__} - {str(e)}")
-                    results["errors"] += 1
-                    return
-                finally:
-                    # Small delay to prevent overwhelming external APIs
-                    await asyncio.sleep(self.rate_limit_delay)
+                    logger.error(f"{name}: after-commit callback failed: {e}")
+        outcomes = iter(statuses)
+        return [item[2] if isinstance(item[2], dict) else next(outcomes) for item in batch]
 
-    async def get_or_create(self, model_class: Type, country_id: int) -> Any:
+    async def _prefetch(self, writes: List[Tuple]) -> Dict[Tuple[Type, int], Any]:
+        """One-to-one rows the batch sets fields of, one query per model (caller holds the lock)"""
+        wanted: Dict[Type, set] = {}
+        for _, country_id, ops in writes:
+            for op in ops:
+                if isinstance(op, SetFields) and op.model is not models.Country:
+                    wanted.setdefault(op.model, set()).add(country_id)
+        rows = {}
+        for model_class, country_ids in wanted.items():
+            result = await self.db.execute(select(model_class).where(model_class.country_id.in_(country_ids)))
+            for obj in result.scalars():
+                rows.setdefault((model_class, obj.country_id), obj)
+        return rows
+
+    async def _apply(self, country_id: int, ops: List[Any], callbacks: List[Callable],
+                     rows: Dict[Tuple[Type, int], Any]) -> Dict[str, str]:
+        """Add the operations of one country to the transaction (caller holds the lock)"""
+        changed = False
+        for op in ops:
+            if isinstance(op, ReplaceRows):
+                digest = None
+                if op.source:
+                    hashed = op.rows if op.hashed is None else op.hashed
+                    digest = await self.db.run_sync(changed_hash, country_id, op.source, hashed)
+                    if not digest:
+                        continue
+                await self.db.run_sync(replace_rows, op.model, country_id, op.rows, op.where)
+                if digest:
+                    await self.db.run_sync(save_hash, country_id, op.source, digest)
+                changed = True
+            elif isinstance(op, SetFields):
+                obj = rows.get((op.model, country_id))
+                if obj is None:
+                    obj = rows[(op.model, country_id)] = await self._one_to_one(op.model, country_id, search=False)
+                for key, value in op.values.items():
+                    if isinstance(value, ClauseElement) or getattr(obj, key) != value:
+                        setattr(obj, key, value)
+                        changed = True
+            elif isinstance(op, AfterCommit):
+                callbacks.append(op.callback)
+            else:
+                raise TypeError(f"Unknown write operation {op!r}")
+        return {"status": "success" if changed else "unchanged"}
+
+    async def _one_to_one(self, model_class: Type, country_id: int, search: bool = True) -> Any:
         """
-        Helper to fetch an existing related record or create a new one.
+        The country's row of model, created when missing (caller holds the lock).
+        search=False when the caller already looked it up in the database.
         """
-        obj = self.db.query(model_class).filter(model_class.country_id == country_id).first()
+        if model_class is models.Country:
+            return await self.db.get(models.Country, country_id)
+        # Rows added earlier in this transaction are not flushed yet (autoflush is off)
+        for obj in self.db.new:
+            if isinstance(obj, model_class) and obj.country_id == country_id:
+                return obj
+        obj = None
+        if search:
+            obj = (await self.db.execute(select(model_class).where(model_class.country_id == country_id))).scalars().first()
         if not obj:
             obj = model_class(country_id=country_id)
             self.db.add(obj)
         return obj
 
-    async def parent_fallback(self, country: models.Country, depth: int = 0) -> Any:
+    async def _commit_or_rollback(self):
+        """Commit, or roll back the whole transaction when the commit itself fails (caller holds the lock)"""
+        try:
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            # Rollback expires every object of the shared session, reload the countries
+            # other tasks (and scrapers) still read attributes from
+            await self.db.execute(select(models.Country))
+            raise
+
+    async def execute(self, statement):
+        async with self.db_lock:
+            return await self.db.execute(statement)
+
+    async def commit(self):
+        async with self.db_lock:
+            await self.db.commit()
+
+    async def update(self, obj: Any, **values):
         """
-        Generic logic to fall back to a parent country if the current one has no data.
+        Set attributes of an object loaded before an await and commit. Done under the
+        lock: changes made while another scraper's commit is flushing would be dropped.
         """
-        if depth > 1 or not country.parent_id:
-            return {"error": "No data found and no further fallbacks available"}
-            
-        parent = self.db.query(models.Country).get(country.parent_id)
-        if parent:
-            logger.info(f"Falling back: {country.iso_alpha2} -> {parent.iso_alpha2}")
-            return await self.sync_country(parent)
-        return {"error": "Parent not found in database"}
+        async with self.db_lock:
+            for key, value in values.items():
+                setattr(obj, key, value)
+            await self.db.commit()
+
+    async def get_or_create(self, model_class: Type, country_id: int) -> Any:
+        """
+        Helper to fetch an existing related record or create a new one.
+        """
+        async with self.db_lock:
+            return await self._one_to_one(model_class, country_id)
@@ -1,14 +1,26 @@
 import logging
-from bs4 import BeautifulSoup
-from sqlalchemy.orm import Session
+from functools import partial
+from typing import List, NamedTuple, Optional, Tuple
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models
 from .utils import CDC_MAPPING, slugify, get_headers
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .extract import extract_vaccines, has_vaccine_table
+from .http_cache import http_cache
+from .parse_pool import PARSE_PROCESSES, parse_pool
+from .pipeline import AfterCommit, Result, SetFields
 
 logger = logging.getLogger("uvicorn")
 
+# Only routine vaccinations are suggested when their page has no table
+NO_TABLE_COUNTRIES = {'US', 'AQ', 'PL'}
+
 class CDCHealthScraper(BaseScraper):
-    def __init__(self, db: Session):
+    # Pages are parsed in worker processes, keep them all busy
+    parse_workers = max(1, PARSE_PROCESSES)
+
+    def __init__(self, db: AsyncSession):
         super().__init__(db, concurrency=10, timeout=60.0)
 
     def get_cdc_slug(self, country: models.Country) -> str:
@@ -20,7 +32,7 @@ class CDCHealthScraper(BaseScraper):
         if "kingdom of" in name: name = name.replace("kingdom of ", "")
         return slugify(name)
 
-    async def sync_country(self, country: models.Country, depth: int = 0):
+    async def fetch(self, country: models.Country):
         slug = self.get_cdc_slug(country)
         urls = [
             f"https://wwwnc.cdc.gov/travel/destinations/traveler/none/{slug}",
@@ -29,49 +41,50 @@ class CDCHealthScraper(BaseScraper):
         ]
         
         for url in urls:
-            try:
-                resp = await self.client.get(url, headers=get_headers(accept="text/html"))
-                if resp.status_code == 200:
-                    soup = BeautifulSoup(resp.text, 'html.parser')
-                    vax_table = soup.select_one('table#dest-vm-a') or \
-                                soup.select_one('table.disease') or \
-                                soup.select_one('table.vax-list-table')
-                    
-                    required, suggested = [], []
-                    
-                    if not vax_table:
-                        if country.iso_alpha2 in ['US', 'AQ', 'PL']:
-                            suggested = ["Zalecane szczepienia rutynowe"]
-                        else:
-                            continue
-                    else:
-                        rows = vax_table.select('tbody tr')
-                        for row in rows:
-                            cells = row.find_all('td')
-                            if len(cells) >= 2:
-                                name = cells[0].get_text(strip=True)
-                                rec = cells[1].get_text(" ", strip=True) 
-                                if any(word in rec.lower() for word in ["required", "mandatory"]):
-                                    required.append(name)
-                                else:
-                                    suggested.append(name)
-
-                    practical = await self.get_or_create(models.PracticalInfo, country.id)
-                    practical.vaccinations_required = ", ".join(required) if required else ""
-                    practical.vaccinations_suggested = ", ".join(suggested) if suggested else ""
-                    self.db.commit()
-                    return {"status": "success"}
-                elif resp.status_code == 404:
-                    continue
-                else:
-                    return {"error": f"CDC returned {resp.status_code}"}
-            except Exception as e:
-                return {"error": f"{type(e).__name__}: {str(e)}"}
+            resp = await self.client.get(url, headers={**get_headers(accept="text/html"), **http_cache.headers(url)})
+            if resp.status_code == 304:
+                return Result(status="unchanged")
+            if resp.status_code == 200:
+                # Pages without a vaccine table are skipped, except where none is expected
+                if has_vaccine_table(resp.text) or country.iso_alpha2 in NO_TABLE_COUNTRIES:
+                    return url, resp
+            elif resp.status_code != 404:
+                return Result(error=f"CDC returned {resp.status_code}")
 
         # Final Fallback to Parent
-        return await self.parent_fallback(country, depth)
+        return Result(error="No data found and no further fallbacks available", not_found=True)
+
+    async def parse(self, country: models.Country, page: Tuple[str, httpx.Response]):
+        url, resp = page
+        vaccines = await parse_pool.run(parse_vaccines, resp.text)
+        return [
+            SetFields(models.PracticalInfo, {
+                "vaccinations_required": ", ".join(vaccines.required),
+                "vaccinations_suggested": ", ".join(vaccines.suggested),
+            }),
+            AfterCommit(partial(http_cache.store, url, resp)),
+        ]
+
+class Vaccines(NamedTuple):
+    required: List[str]
+    suggested: List[str]
+
+def parse_vaccines(html: str, engine: Optional[str] = None) -> Vaccines:
+    """Vaccine table of a CDC destination page (runs in a parse worker process)"""
+    rows = extract_vaccines(html, engine)
+    required, suggested = [], []
+    
+    if rows is None:
+        suggested = ["Zalecane szczepienia rutynowe"]
+    else:
+        for name, rec in rows:
+            if any(word in rec.lower() for word in ["required", "mandatory"]):
+                required.append(name)
+            else:
+                suggested.append(name)
+    return Vaccines(required, suggested)
 
-async def sync_all_cdc(db: Session):
-    countries = db.query(models.Country).all()
+async def sync_all_cdc(db: AsyncSession):
+    countries = await load_countries(db)
     scraper = CDCHealthScraper(db)
     return await scraper.run(countries)
@@ -1,23 +1,22 @@
 import logging
-import asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .pipeline import ReplaceRows, Result
 from collections import defaultdict
 
 logger = logging.getLogger("uvicorn")
 
 class ClimateScraper(BaseScraper):
-    def __init__(self, db: Session):
-        # Open-Meteo is very sensitive to many parallel requests
-        super().__init__(db, concurrency=1, timeout=60.0)
-        self.rate_limit_delay = 2.0 
+    def __init__(self, db: AsyncSession):
+        # Open-Meteo's archive API is sensitive to bursts, its pace is set in http_client.HOST_RATES
+        super().__init__(db, timeout=60.0)
 
-    async def sync_country(self, country: models.Country):
+    async def fetch(self, country: models.Country):
         # Coordinates
         lat, lon = country.latitude, country.longitude
         if lat is None or lon is None:
-            return {"error": "Missing coordinates"}
+            return Result(error="Missing coordinates")
 
         url = "https://archive-api.open-meteo.com/v1/archive"
         params = {
@@ -29,57 +28,50 @@ class ClimateScraper(BaseScraper):
             "timezone": "auto"
         }
 
-        try:
-            resp = await self.client.get(url, params=params)
-            if resp.status_code != 200:
-                return {"error": f"Open-Meteo returned {resp.status_code}"}
-            
-            data = resp.json().get("daily", {})
-            if not data:
-                return {"error": "No daily data in response"}
+        resp = await self.client.get(url, params=params)
+        if resp.status_code != 200:
+            return Result(error=f"Open-Meteo returned {resp.status_code}")
+        return resp.json().get("daily", {})
 
-            # Aggregate by month
-            months = defaultdict(lambda: {"max": [], "min": [], "rain": []})
-            for i, date_str in enumerate(data.get("time", [])):
-                month = int(date_str.split("-")[1])
-                if data["temperature_2m_max"][i] is not None:
-                    months[month]["max"].append(data["temperature_2m_max"][i])
-                if data["temperature_2m_min"][i] is not None:
-                    months[month]["min"].append(data["temperature_2m_min"][i])
-                if data["rain_sum"][i] is not None:
-                    months[month]["rain"].append(data["rain_sum"][i])
+    def parse(self, country: models.Country, data: dict):
+        if not data:
+            return Result(error="No daily data in response")
 
-            # Update DB
-            self.db.query(models.Climate).filter(models.Climate.country_id == country.id).delete()
-            
-            for month, vals in months.items():
-                if not vals["max"]: continue
-                
-                avg_max = sum(vals["max"]) / len(vals["max"])
-                avg_min = sum(vals["min"]) / len(vals["min"])
-                total_rain = sum(vals["rain"])
-                
-                # Simple season detection
-                season = "shoulder"
-                if avg_max > 25 and total_rain < 50: season = "dry"
-                elif total_rain > 150: season = "wet"
+        # Aggregate by month
+        months = defaultdict(lambda: {"max": [], "min": [], "rain": []})
+        for i, date_str in enumerate(data.get("time", [])):
+            month = int(date_str.split("-")[1])
+            if data["temperature_2m_max"][i] is not None:
+                months[month]["max"].append(data["temperature_2m_max"][i])
+            if data["temperature_2m_min"][i] is not None:
+                months[month]["min"].append(data["temperature_2m_min"][i])
+            if data["rain_sum"][i] is not None:
+                months[month]["rain"].append(data["rain_sum"][i])
 
-                db_climate = models.Climate(
-                    country_id=country.id,
-                    month=month,
-                    avg_temp_max=int(avg_max),
-                    avg_temp_min=int(avg_min),
-                    avg_rain_mm=int(total_rain),
-                    season_type=season
-                )
-                self.db.add(db_climate)
+        rows = []
+        for month, vals in sorted(months.items()):
+            if not vals["max"]: continue
+            
+            avg_max = sum(vals["max"]) / len(vals["max"])
+            avg_min = sum(vals["min"]) / len(vals["min"])
+            total_rain = sum(vals["rain"])
             
-            self.db.commit()
-            return {"status": "success"}
-        except Exception as e:
-            return {"error": str(e)}
+            # Simple season detection
+            season = "shoulder"
+            if avg_max > 25 and total_rain < 50: season = "dry"
+            elif total_rain > 150: season = "wet"
+
+            rows.append({
+                "month": month,
+                "avg_temp_max": int(avg_max),
+                "avg_temp_min": int(avg_min),
+                "avg_rain_mm": int(total_rain),
+                "season_type": season
+            })
+
+        return [ReplaceRows(models.Climate, rows, source="climate")]
 
-async def sync_all_climate(db: Session, force: bool = False):
-    countries = db.query(models.Country).all()
+async def sync_all_climate(db: AsyncSession, force: bool = False):
+    countries = await load_countries(db)
     scraper = ClimateScraper(db)
     return await scraper.run(countries)
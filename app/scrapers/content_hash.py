@@ -0,0 +1,31 @@
+import hashlib
+import json
+from typing import Any, Optional
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from .. import models
+
+def content_hash(payload: Any) -> str:
+    """SHA-256 of JSON-like data, independent of dict key order"""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def changed_hash(db: Session, country_id: int, source: str, payload: Any) -> Optional[str]:
+    """
+    Hash of payload if it differs from the one saved with the last write of source for
+    the country, None when the same data was already written.
+    """
+    digest = content_hash(payload)
+    stored = db.execute(select(models.SourceHash.hash).where(
+        models.SourceHash.country_id == country_id, models.SourceHash.source == source
+    )).scalar()
+    return None if stored == digest else digest
+
+def save_hash(db: Session, country_id: int, source: str, digest: str):
+    """Record the hash in the transaction of the writes it describes (call before the commit)"""
+    result = db.execute(update(models.SourceHash).where(
+        models.SourceHash.country_id == country_id, models.SourceHash.source == source
+    ).values(hash=digest, last_updated=func.now()))
+    if not result.rowcount:
+        db.execute(insert(models.SourceHash).values(country_id=country_id, source=source, hash=digest))
@@ -1,10 +1,10 @@
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 from typing import Any
 
 from .. import models
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
 
 logger = logging.getLogger("uvicorn")
 
@@ -37,7 +37,7 @@ class CostsScraper(BaseScraper):
     Updates cost of living based on pre-calculated index data.
     Calculates ratio relative to Poland (PL).
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 30.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 30.0):
         super().__init__(db, concurrency, timeout)
         self.pl_index = COST_DATA.get('PL', 42.0)
 
@@ -51,26 +51,27 @@ class CostsScraper(BaseScraper):
         
         cost_entry = await self.get_or_create(models.CostOfLiving, country.id)
         
-        cost_entry.index_overall = index
-        cost_entry.index_restaurants = index * 0.95
-        cost_entry.index_groceries = index * 1.05
-        cost_entry.index_transport = index * 0.85
-        cost_entry.index_accommodation = index * 1.2
-        cost_entry.ratio_to_poland = ratio
-        cost_entry.daily_budget_low = round(pl_low * ratio, 2)
-        cost_entry.daily_budget_mid = round(pl_mid * ratio, 2)
-        cost_entry.daily_budget_high = round(pl_high * ratio, 2)
-        cost_entry.last_updated = func.now()
-        
-        self.db.commit()
+        await self.update(
+            cost_entry,
+            index_overall=index,
+            index_restaurants=index * 0.95,
+            index_groceries=index * 1.05,
+            index_transport=index * 0.85,
+            index_accommodation=index * 1.2,
+            ratio_to_poland=ratio,
+            daily_budget_low=round(pl_low * ratio, 2),
+            daily_budget_mid=round(pl_mid * ratio, 2),
+            daily_budget_high=round(pl_high * ratio, 2),
+            last_updated=func.now(),
+        )
         return {"status": "success"}
 
-async def sync_costs(db: Session):
+async def sync_costs(db: AsyncSession):
     """
     Asynchronously updates cost of living for all countries.
     """
     scraper = CostsScraper(db)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     logger.info(f"Synced cost data: {results['success']} success, {results['errors']} errors")
     return results
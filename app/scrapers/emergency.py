@@ -1,12 +1,12 @@
-import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models
 import json
 import logging
 import asyncio
 from typing import Dict, Any, List
 
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .http_client import http_clients
 
 logger = logging.getLogger("uvicorn")
 
@@ -30,7 +30,7 @@ class EmergencyScraper(BaseScraper):
     """
     Syncs emergency numbers for countries using EmergencyNumberAPI and manual fallbacks.
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 30.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 30.0):
         super().__init__(db, concurrency, timeout)
         self.dump_data: Dict[str, Any] = {}
 
@@ -38,25 +38,24 @@ class EmergencyScraper(BaseScraper):
         """
         Overridden run to fetch all data once before distributing to sync_country calls.
         """
-        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
-            self.client = client
-            try:
-                resp = await self.client.get("https://emergencynumberapi.com/api/data/all")
-                if resp.status_code == 200:
-                    data = resp.json()
-                    full_list = data.get("value", data) if isinstance(data, dict) else data
-                    if isinstance(full_list, list):
-                        for entry in full_list:
-                            iso = entry.get("Country", {}).get("ISOCode")
-                            if iso: self.dump_data[iso.upper()] = entry
-            except Exception as e:
-                logger.warning(f"Emergency API Dump error: {e}")
+        self.client = http_clients.client(self.timeout)
+        try:
+            resp = await self.client.get("https://emergencynumberapi.com/api/data/all")
+            if resp.status_code == 200:
+                data = resp.json()
+                full_list = data.get("value", data) if isinstance(data, dict) else data
+                if isinstance(full_list, list):
+                    for entry in full_list:
+                        iso = entry.get("Country", {}).get("ISOCode")
+                        if iso: self.dump_data[iso.upper()] = entry
+        except Exception as e:
+            logger.warning(f"Emergency API Dump error: {e}")
 
-            results = {"success": 0, "errors": 0}
-            tasks = [self._limited_sync(country, results) for country in countries]
-            await asyncio.gather(*tasks)
+        results = {"success": 0, "errors": 0}
+        tasks = [self._limited_sync(country, results) for country in countries]
+        await asyncio.gather(*tasks)
             
-            return results
+        return results
 
     async def sync_country(self, country: models.Country) -> Any:
         iso2 = country.iso_alpha2.upper()
@@ -100,8 +99,7 @@ class EmergencyScraper(BaseScraper):
 
             try:
                 practical = await self.get_or_create(models.PracticalInfo, country.id)
-                practical.emergency_numbers = json.dumps(emergency_data)
-                self.db.commit()
+                await self.update(practical, emergency_numbers=json.dumps(emergency_data))
                 return {"status": "success"}
             except Exception as e:
                 logger.error(f"Error updating emergency numbers for {country.iso_alpha2}: {e}")
@@ -109,12 +107,12 @@ class EmergencyScraper(BaseScraper):
         
         return {"status": "skipped", "reason": "No emergency data found"}
 
-async def sync_emergency_numbers(db: Session):
+async def sync_emergency_numbers(db: AsyncSession):
     """
     Legacy wrapper for syncing emergency numbers.
     """
     scraper = EmergencyScraper(db)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     
     # Return in legacy format
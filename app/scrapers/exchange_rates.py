@@ -1,5 +1,5 @@
-import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models
 from sqlalchemy.sql import func
 import logging
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List
 
 from .base import BaseScraper
+from .http_client import http_clients
 
 logger = logging.getLogger("uvicorn")
 
@@ -15,7 +16,7 @@ class ExchangeRateScraper(BaseScraper):
     Syncs currency exchange rates from NBP.
     Calculates currency strength based on comparison with historical average (approx 1 year ago).
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 15.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 15.0):
         super().__init__(db, concurrency, timeout)
         self.current_data: Dict[str, Any] = {}
         self.historical_data: Dict[str, float] = {}
@@ -35,29 +36,28 @@ class ExchangeRateScraper(BaseScraper):
             f"https://api.nbp.pl/api/exchangerates/tables/B/{historical_date}?format=json"
         ]
 
-        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
-            self.client = client
-            # Fetch Current
-            for url in urls:
-                try:
-                    resp = await self.client.get(url)
-                    if resp.status_code == 200:
-                        rates = resp.json()[0].get("rates", [])
-                        for r in rates:
-                            self.current_data[r["code"].upper()] = {"rate": r["mid"], "name": r["currency"]}
-                except Exception as e:
-                    logger.warning(f"Error fetching current rates from {url}: {e}")
+        self.client = http_clients.client(self.timeout)
+        # Fetch Current
+        for url in urls:
+            try:
+                resp = await self.client.get(url)
+                if resp.status_code == 200:
+                    rates = resp.json()[0].get("rates", [])
+                    for r in rates:
+                        self.current_data[r["code"].upper()] = {"rate": r["mid"], "name": r["currency"]}
+            except Exception as e:
+                logger.warning(f"Error fetching current rates from {url}: {e}")
                     
-            # Fetch Historical (Best effort)
-            for url in hist_urls:
-                try:
-                    resp = await self.client.get(url)
-                    if resp.status_code == 200:
-                        rates = resp.json()[0].get("rates", [])
-                        for r in rates:
-                            self.historical_data[r["code"].upper()] = r["mid"]
-                except Exception as e:
-                    logger.warning(f"Error fetching historical rates from {url}: {e}")
+        # Fetch Historical (Best effort)
+        for url in hist_urls:
+            try:
+                resp = await self.client.get(url)
+                if resp.status_code == 200:
+                    rates = resp.json()[0].get("rates", [])
+                    for r in rates:
+                        self.historical_data[r["code"].upper()] = r["mid"]
+            except Exception as e:
+                logger.warning(f"Error fetching historical rates from {url}: {e}")
 
         if not self.current_data:
             return {"success": 0, "errors": 1}
@@ -65,7 +65,7 @@ class ExchangeRateScraper(BaseScraper):
         # Instead of countries, we sync all currencies
         updated = 0
         errors = 0
-        currencies = self.db.query(models.Currency).all()
+        currencies = (await self.execute(select(models.Currency))).scalars().all()
         
         for curr in currencies:
             try:
@@ -92,32 +92,35 @@ class ExchangeRateScraper(BaseScraper):
         code = curr.code.upper()
         if code in self.current_data:
             info = self.current_data[code]
-            curr.exchange_rate_pln = info["rate"]
-            curr.name = info["name"].capitalize()
-            curr.last_updated = func.now()
             
             # Strength Logic: Is PLN stronger or weaker than a year ago?
             hist_rate = self.historical_data.get(code)
             if hist_rate:
                 diff_pct = ((info["rate"] - hist_rate) / hist_rate) * 100
                 if diff_pct > 5:
-                    curr.relative_cost = "Waluta mocna (droga)"
+                    relative_cost = "Waluta mocna (droga)"
                 elif diff_pct < -5:
-                    curr.relative_cost = "Waluta słaba (tania)"
+                    relative_cost = "Waluta słaba (tania)"
                 else:
-                    curr.relative_cost = "Kurs stabilny"
+                    relative_cost = "Kurs stabilny"
             else:
                 # Nominal fallback if no history
-                if info["rate"] > 10: curr.relative_cost = "Wysoka wartość jedn."
-                elif info["rate"] < 0.1: curr.relative_cost = "Niska wartość jedn."
-                else: curr.relative_cost = "Średnia"
+                if info["rate"] > 10: relative_cost = "Wysoka wartość jedn."
+                elif info["rate"] < 0.1: relative_cost = "Niska wartość jedn."
+                else: relative_cost = "Średnia"
                 
-            self.db.commit()
+            await self.update(
+                curr,
+                exchange_rate_pln=info["rate"],
+                name=info["name"].capitalize(),
+                last_updated=func.now(),
+                relative_cost=relative_cost,
+            )
             return {"status": "success"}
         
         return {"status": "skipped", "reason": f"No rate for {code}"}
 
-async def sync_rates(db: Session):
+async def sync_rates(db: AsyncSession):
     """
     Legacy wrapper for syncing exchange rates.
     """
@@ -0,0 +1,229 @@
+import os
+import re
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # requirements.txt installs it, BeautifulSoup alone still works
+    lxml = None
+
+# Parts of the scraped pages the parsers use, extracted with BeautifulSoup's html.parser
+# or with lxml (C parser, only the needed subtrees are walked). lxml builds a different
+# tree for misnested markup (e.g. <div> inside <p>), so it stays opt-in until
+# scripts/check_parsers.py passes on saved real gov.pl, CDC and Wikipedia pages.
+HTML_ENGINE = os.environ.get("HTML_ENGINE", "bs4")
+
+# Text BeautifulSoup's get_text() leaves out (comments are not text nodes in lxml)
+_NON_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+_PRESERVE_TAGS = {"pre", "textarea"}
+_ASCII_SPACES = " \n\t\f\r"
+_HEADERS = ("h2", "h3", "h4")
+# CDC vaccine table selectors in order of preference: table#dest-vm-a, table.disease, table.vax-list-table
+_VACCINE_TABLES = (("id", "dest-vm-a"), ("class", "disease"), ("class", "vax-list-table"))
+_TABLE_TAG_RE = re.compile(r"<(/?)table\b[^>]*>", re.I)
+# Markup that is not part of the document tree
+_NON_TREE_RE = re.compile(r"<!--.*?-->|<script\b.*?</script\s*>|<style\b.*?</style\s*>", re.I | re.S)
+# Attributes of a start tag: name, then a double-quoted, single-quoted or bare value
+_ATTR_RE = re.compile(r"""(?<![\w-])([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+class MSZPage(NamedTuple):
+    risk_text: Optional[str]
+    strong_texts: List[str]
+    # Text of the elements following the first customs ("Cło") header
+    customs_section: str
+    # Stripped: parsers differ in the whitespace they keep around <html>
+    page_text: str
+
+def _engine(engine: Optional[str]) -> str:
+    engine = engine or HTML_ENGINE
+    if engine == "lxml" and lxml is None:
+        raise RuntimeError("HTML_ENGINE=lxml needs the lxml package")
+    return engine
+
+# --- lxml ---
+
+_PARSER = lxml.html.HTMLParser(encoding="utf-8") if lxml else None
+
+def _document(html: str):
+    # Encoded first: lxml refuses str input with an XML encoding declaration
+    return lxml.html.document_fromstring(html.encode("utf-8"), parser=_PARSER)
+
+def _bs4_string(text: str, preserve: bool) -> str:
+    # BeautifulSoup stores whitespace-only strings as a single newline or space
+    if preserve or text.strip(_ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+def _strings(element, preserve: bool = False) -> Iterator[str]:
+    """Text nodes under element in document order, as BeautifulSoup's get_text() sees them"""
+    preserve = preserve or element.tag in _PRESERVE_TAGS
+    if element.text:
+        yield _bs4_string(element.text, preserve)
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+            yield from _strings(child, preserve)
+        if child.tail:
+            yield _bs4_string(child.tail, preserve)
+
+def _text(element, separator: str = "", strip: bool = False) -> str:
+    """element.get_text(separator, strip=strip) of BeautifulSoup"""
+    strings = _strings(element)
+    if strip:
+        strings = (s.strip() for s in strings)
+        strings = (s for s in strings if s)
+    return separator.join(strings)
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _msz_lxml(html: str) -> MSZPage:
+    doc = _document(html)
+    risk = doc.xpath(f"(//*[{_has_class('travel-advisory--risk-level')}])[1]") or \
+           doc.xpath(f"(//*[{_has_class('safety-level')}])[1]")
+    customs = ""
+    for header in doc.iter(*_HEADERS):
+        if "cło" in _text(header).lower():
+            content = []
+            for sibling in header.itersiblings():
+                if not isinstance(sibling.tag, str):
+                    continue
+                if sibling.tag in _HEADERS:
+                    break
+                content.append(_text(sibling).strip())
+            customs = "\n".join(filter(None, content))
+            break
+    return MSZPage(
+        risk_text=_text(risk[0]) if risk else None,
+        strong_texts=[_text(s).strip() for s in doc.iter("strong")],
+        customs_section=customs,
+        page_text=_text(doc).strip(),
+    )
+
+def _attribute(tag: str, name: str) -> Optional[str]:
+    """Value of an attribute of a start tag, the first one when repeated (as in the parsers)"""
+    for match in _ATTR_RE.finditer(tag):
+        if match.group(1).lower() == name:
+            return next(g for g in match.groups()[1:] if g is not None)
+    return None
+
+def _table_fragment(html: str) -> Optional[str]:
+    """Source of the preferred vaccine table (nested tables included), found without parsing the page"""
+    skipped = [m.span() for m in _NON_TREE_RE.finditer(html)]
+    tags = [tag for tag in _TABLE_TAG_RE.finditer(html)
+            if not any(start <= tag.start() < end for start, end in skipped)]
+    for attr, value in _VACCINE_TABLES:
+        for i, tag in enumerate(tags):
+            if tag.group(1):
+                continue
+            found = _attribute(tag.group(0), attr)
+            if found is None or (value not in found.split() if attr == "class" else found != value):
+                continue
+            depth = 0
+            for other in tags[i:]:
+                depth += -1 if other.group(1) else 1
+                if depth == 0:
+                    return html[tag.start():other.end()]
+            return html[tag.start():]
+    return None
+
+def _vaccines_lxml(html: str) -> Optional[List[Tuple[str, str]]]:
+    fragment = _table_fragment(html)
+    if fragment is None:
+        return None
+    table = lxml.html.fragment_fromstring(fragment.encode("utf-8"), parser=_PARSER)
+    rows = []
+    for row in table.xpath(".//tbody//tr"):
+        cells = list(row.iter("td"))
+        if len(cells) >= 2:
+            rows.append((_text(cells[0], strip=True), _text(cells[1], " ", strip=True)))
+    return rows
+
+def _visas_lxml(html: str) -> Optional[List[Tuple[str, str]]]:
+    doc = _document(html)
+    for table in doc.iter("table"):
+        rows = list(table.iter("tr"))
+        # Row count first: far cheaper than the text of every table
+        if len(rows) > 150:
+            text = _text(table).lower()
+            if "visa requirement" in text and "country" in text:
+                return _visa_rows(rows, lambda row: row.iter("td", "th"), lambda cell: _text(cell, strip=True))
+    return None
+
+# --- BeautifulSoup ---
+
+def _msz_soup(html: str) -> MSZPage:
+    soup = BeautifulSoup(html, 'html.parser')
+    risk = soup.select_one('.travel-advisory--risk-level') or soup.select_one('.safety-level')
+    customs = ""
+    for h in soup.find_all(list(_HEADERS)):
+        if 'cło' in h.get_text().lower():
+            content = []
+            curr = h.find_next_sibling()
+            while curr and curr.name not in _HEADERS:
+                content.append(curr.get_text().strip())
+                curr = curr.find_next_sibling()
+            customs = "\n".join(filter(None, content))
+            break
+    return MSZPage(
+        risk_text=risk.get_text() if risk else None,
+        strong_texts=[s.get_text().strip() for s in soup.find_all('strong')],
+        customs_section=customs,
+        page_text=soup.get_text().strip(),
+    )
+
+def _vaccines_soup(html: str) -> Optional[List[Tuple[str, str]]]:
+    soup = BeautifulSoup(html, 'html.parser')
+    vax_table = soup.select_one('table#dest-vm-a') or \
+                soup.select_one('table.disease') or \
+                soup.select_one('table.vax-list-table')
+    if not vax_table:
+        return None
+    rows = []
+    for row in vax_table.select('tbody tr'):
+        cells = row.find_all('td')
+        if len(cells) >= 2:
+            rows.append((cells[0].get_text(strip=True), cells[1].get_text(" ", strip=True)))
+    return rows
+
+def _visas_soup(html: str) -> Optional[List[Tuple[str, str]]]:
+    soup = BeautifulSoup(html, 'html.parser')
+    for table in soup.find_all('table'):
+        text = table.get_text().lower()
+        if "visa requirement" in text and "country" in text:
+            rows = table.find_all('tr')
+            if len(rows) > 150:
+                return _visa_rows(rows, lambda row: row.find_all(['td', 'th']), lambda cell: cell.get_text(strip=True))
+    return None
+
+def _visa_rows(rows, cells_of: Callable, text_of: Callable) -> List[Tuple[str, str]]:
+    visas = []
+    for row in rows:
+        cols = list(cells_of(row))
+        if len(cols) >= 2:
+            visas.append((text_of(cols[0]), text_of(cols[1])))
+    return visas
+
+# --- API ---
+
+_EXTRACTORS: Dict[str, Dict[str, Callable]] = {
+    "msz": {"lxml": _msz_lxml, "bs4": _msz_soup},
+    "vaccines": {"lxml": _vaccines_lxml, "bs4": _vaccines_soup},
+    "visas": {"lxml": _visas_lxml, "bs4": _visas_soup},
+}
+
+def extract_msz(html: str, engine: Optional[str] = None) -> MSZPage:
+    """Risk level container, warnings in bold, customs section and text of an MSZ page"""
+    return _EXTRACTORS["msz"][_engine(engine)](html)
+
+def extract_vaccines(html: str, engine: Optional[str] = None) -> Optional[List[Tuple[str, str]]]:
+    """(vaccine, recommendation) rows of a CDC page, None when it has no vaccine table"""
+    return _EXTRACTORS["vaccines"][_engine(engine)](html)
+
+def has_vaccine_table(html: str) -> bool:
+    """Whether extract_vaccines() finds a table, checked without parsing the page"""
+    return _table_fragment(html) is not None
+
+def extract_visas(html: str, engine: Optional[str] = None) -> Optional[List[Tuple[str, str]]]:
+    """(country, requirement) cells of the main visa table, None when the article has none"""
+    return _EXTRACTORS["visas"][_engine(engine)](html)
@@ -1,80 +1,108 @@
-import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .. import models
 from datetime import date
-import asyncio
 import logging
-from typing import Any
+from typing import Any, Dict, List, Tuple
 
-from .base import BaseScraper
-from .utils import translate_to_pl, get_headers
+from .base import BaseScraper, load_countries
+from .content_hash import content_hash
+from .pipeline import ReplaceRows, Result
+from .http_client import HTTPClient, http_clients
+from .translations import translation_memory
+from .utils import get_headers
 
 logger = logging.getLogger("uvicorn")
 
 class HolidayScraper(BaseScraper):
     """Sync holidays for a country from Nager.Date API with automatic translation"""
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 45.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 45.0):
         super().__init__(db, concurrency, timeout)
+        # Last written holidays hash per country, read once per run
+        self.stored_hashes: Dict[int, str] = {}
 
-    async def sync_country(self, country: models.Country) -> Any:
+    async def run(self, countries: List[models.Country]) -> Dict[str, int]:
+        # Translation memory and hashes first, so fetchers never wait for the writer's lock
+        async with self.db_lock:
+            await self.db.run_sync(translation_memory.load)
+            result = await self.db.execute(select(models.SourceHash.country_id, models.SourceHash.hash)
+                                           .where(models.SourceHash.source == "holidays"))
+        self.stored_hashes = dict(result.all())
+        return await super().run(countries)
+
+    async def fetch(self, country: models.Country) -> Any:
         current_year = date.today().year
         iso2 = country.iso_alpha2.upper()
         
         if iso2 == 'XK':
-            return {"status": "skipped", "reason": "Kosovo not supported by Nager.Date"}
+            return Result(status="skipped")
         
         url = f"https://date.nager.at/api/v3/PublicHolidays/{current_year}/{iso2}"
 
-        try:
-            response = await self.client.get(url, headers=get_headers())
-            if response.status_code == 204:
-                return {"status": "success", "data": []}
-            if response.status_code != 200:
-                return {"error": f"HTTP {response.status_code}"}
-            holidays_data = response.json()
-        except Exception as e:
-            return {"error": str(e)}
-
-        # Delete existing holidays for the current year
-        self.db.query(models.Holiday).filter(
-            models.Holiday.country_id == country.id,
-            models.Holiday.date >= date(current_year, 1, 1),
-            models.Holiday.date <= date(current_year, 12, 31)
-        ).delete()
-
+        response = await self.client.get(url, headers=get_headers())
+        if response.status_code == 204:
+            return Result()
+        if response.status_code != 200:
+            return Result(error=f"HTTP {response.status_code}")
+        holidays_data = response.json()
         if not isinstance(holidays_data, list):
             holidays_data = []
 
+        # Hashed before translation, unchanged holidays need no translation requests
+        payload = {"year": current_year, "holidays": [
+            [h.get('name'), h.get('localName'), h.get('date')] for h in holidays_data if isinstance(h, dict)
+        ]}
+        if self.stored_hashes.get(country.id) == content_hash(payload):
+            return Result(status="unchanged")
+
+        # One batch for all names of the country, known ones come from the translation memory
+        names = await translation_memory.translate_many_async(
+            h.get('name') or h.get('localName') for h in holidays_data if isinstance(h, dict)
+        )
+        return current_year, holidays_data, names, payload
+
+    def parse(self, country: models.Country, raw: Tuple[int, List[dict], Dict[str, str], dict]):
+        current_year, holidays_data, names, payload = raw
+        rows = []
         for h in holidays_data:
             try:
                 original_name = h.get('name') or h.get('localName')
-                name_pl = translate_to_pl(original_name)
-                
-                self.db.add(models.Holiday(
-                    country_id=country.id,
-                    name=name_pl,
-                    name_local=h.get('localName'),
-                    date=date.fromisoformat(h.get('date')),
-                    type='Public'
-                ))
+                rows.append({
+                    "name": names.get(original_name, original_name),
+                    "name_local": h.get('localName'),
+                    "date": date.fromisoformat(h.get('date')),
+                    "type": 'Public'
+                })
             except Exception as e:
-                logger.debug(f"Error adding holiday for {iso2}: {e}")
+                logger.debug(f"Error adding holiday for {country.iso_alpha2}: {e}")
                 continue
 
-        self.db.commit()
-        return {"status": "success", "count": len(holidays_data)}
+        # Replaces the holidays of the current year only
+        return [ReplaceRows(models.Holiday, rows, source="holidays", hashed=payload, where=(
+            models.Holiday.date >= date(current_year, 1, 1),
+            models.Holiday.date <= date(current_year, 12, 31)
+        ))]
+
+    def before_commit(self, session: Session):
+        translation_memory.save(session)
+
+    def after_commit(self):
+        translation_memory.saved()
 
-async def sync_holidays(db: Session, iso2: str, client: httpx.AsyncClient):
+async def sync_holidays(db: AsyncSession, iso2: str, client: HTTPClient = None):
     """Legacy wrapper for syncing holidays for a single country"""
     scraper = HolidayScraper(db)
-    scraper.client = client
-    country = db.query(models.Country).filter(models.Country.iso_alpha2 == iso2.upper()).first()
+    scraper.client = client or http_clients.client(scraper.timeout, get_headers())
+    country = (await scraper.execute(select(models.Country).where(models.Country.iso_alpha2 == iso2.upper()))).scalars().first()
     if not country: return {"error": "Country not found"}
+    async with scraper.db_lock:
+        await db.run_sync(translation_memory.load)
     return await scraper.sync_country(country)
 
-async def sync_all_holidays(db: Session):
+async def sync_all_holidays(db: AsyncSession):
     """Legacy wrapper for syncing holidays for all countries"""
     scraper = HolidayScraper(db, concurrency=5)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     return {"synced": results["success"], "errors": results["errors"]}
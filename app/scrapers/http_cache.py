@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+import httpx
+
+logger = logging.getLogger("uvicorn")
+
+# Kept next to the database: a validator means "this page version is already in the DB",
+# so the file belongs to the database it was written for (CI commits both)
+HTTP_CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", "./http_validators.json")
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE", "1") != "0"
+# Re-download and re-parse pages at least this often, whatever the server says
+MAX_AGE = float(os.environ.get("HTTP_CACHE_MAX_AGE_DAYS", "7")) * 86400
+
+class ConditionalCache:
+    """
+    ETag / Last-Modified of pages whose parsed content has been written to the database.
+    Requests send them back (If-None-Match / If-Modified-Since) and a 304 lets the scraper
+    skip parsing and DB writes. store() must only be called after a successful write, so
+    a failed parse or write is retried with a full download next time.
+    """
+    def __init__(self, path: str = HTTP_CACHE_PATH, enabled: bool = HTTP_CACHE_ENABLED, max_age: float = MAX_AGE):
+        self.path = path
+        self.enabled = enabled
+        self.max_age = max_age
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    @property
+    def entries(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable HTTP cache {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def headers(self, key: str) -> Dict[str, str]:
+        """Conditional request headers for a page stored under key"""
+        entry = self.entries.get(key) if self.enabled else None
+        if not entry or time.time() - entry.get("stored_at", 0) > self.max_age:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, response: httpx.Response):
+        """Remember the validators of a response whose content is now in the database"""
+        if not self.enabled or response.status_code != 200:
+            return
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if not etag and not last_modified:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = {"etag": etag, "last_modified": last_modified, "stored_at": int(time.time())}
+        self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+http_cache = ConditionalCache()
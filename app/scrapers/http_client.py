@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from ..metrics import (
+    HTTPX_EVENT_HOOKS, SCRAPER_BYTES, SCRAPER_CIRCUIT_REJECTED, SCRAPER_CIRCUIT_STATE,
+    SCRAPER_HOST_RATE, SCRAPER_THROTTLED,
+)
+
+logger = logging.getLogger("uvicorn")
+
+def _module_available(name: str) -> bool:
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+# httpx[http2]; without h2 requests use HTTP/1.1. httpx advertises and decodes gzip,
+# and brotli too when httpx[brotli] is installed.
+HTTP2 = os.environ.get("SCRAPER_HTTP2", "1") != "0" and _module_available("h2")
+
+# Requests in flight per host (also the connection pool size of its client)
+DEFAULT_HOST_LIMIT = int(os.environ.get("SCRAPER_HOST_LIMIT", "8"))
+HOST_LIMITS = {
+    "query.wikidata.org": 2,
+    "www.gov.pl": 5,
+    "wwwnc.cdc.gov": 5,
+    "archive-api.open-meteo.com": 2,
+}
+KEEPALIVE_EXPIRY = 30.0
+
+# Requests per second per host: (starting rate, ceiling). The limiter adapts between
+# MIN_RATE and the ceiling, so these replace the fixed sleeps scrapers used to have.
+DEFAULT_HOST_RATE = (float(os.environ.get("SCRAPER_HOST_RATE", "10")), 25.0)
+HOST_RATES = {
+    "query.wikidata.org": (0.5, 2.0),
+    "archive-api.open-meteo.com": (0.5, 2.0),
+    "api.open-meteo.com": (10.0, 20.0),
+    "www.gov.pl": (4.0, 10.0),
+}
+MIN_RATE = 0.05
+# Multiplicative decrease on 429/5xx, additive increase (share of the ceiling) on success
+DECREASE_FACTOR = 0.5
+INCREASE_SHARE = 0.05
+# Longest Retry-After we wait for (seconds)
+MAX_RETRY_AFTER = 300.0
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+# Circuit breaker per host: (consecutive failures that open it, seconds open before a probe).
+# Failures are transport errors and 5xx responses; 429 only slows the rate limiter down.
+DEFAULT_BREAKER = (int(os.environ.get("SCRAPER_BREAKER_THRESHOLD", "10")),
+                   float(os.environ.get("SCRAPER_BREAKER_COOLDOWN", "60")))
+HOST_BREAKERS = {
+    "query.wikidata.org": (10, 300.0),
+}
+BREAKER_FAILURE_STATUSES = {500, 502, 503, 504}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half-open", "open"
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (delay in seconds or an HTTP date) as seconds from now"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """
+    Adaptive token bucket of one host (AIMD): the rate grows a little after every
+    successful response and is halved on 429/5xx or a transport error. Retry-After
+    pauses the host until the given time.
+    """
+    def __init__(self, host: str, rate: float, max_rate: float):
+        self.host = host
+        self.rate = min(rate, max_rate)
+        self.max_rate = max_rate
+        self.increase = max_rate * INCREASE_SHARE
+        self.burst = max(1.0, rate)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        # Waiters are served in order
+        self._lock = asyncio.Lock()
+        SCRAPER_HOST_RATE.labels(host).set(self.rate)
+
+    async def acquire(self) -> float:
+        """Wait for a token (behind earlier waiters), returns the seconds spent waiting"""
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+
+    def feedback(self, status: Optional[int], retry_after: Optional[float] = None):
+        """Adjust the rate after a response (status None: transport error)"""
+        if status is None or status in BACKOFF_STATUSES:
+            self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+            if retry_after:
+                # No burst right after the pause
+                self.blocked_until = max(self.blocked_until, time.monotonic() + min(retry_after, MAX_RETRY_AFTER))
+                self.tokens, self.updated = 0.0, self.blocked_until
+            logger.warning(f"Rate limit for {self.host} lowered to {self.rate:.2f} req/s"
+                           + (f", paused {retry_after:.0f}s (Retry-After)" if retry_after else ""))
+        elif status < 400:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+        SCRAPER_HOST_RATE.labels(self.host).set(self.rate)
+
+class CircuitOpenError(httpx.HTTPError):
+    """Request not sent because its host is failing; not retried by BaseScraper"""
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after `threshold` consecutive failures, so requests fail
+    fast (CircuitOpenError) instead of each country waiting out timeouts and retries.
+    After `cooldown` seconds one probe request is let through (half-open): success
+    closes the breaker, failure opens it for another cooldown.
+    """
+    def __init__(self, host: str, threshold: int, cooldown: float):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        SCRAPER_CIRCUIT_STATE.labels(host).set(0)
+
+    def allow(self) -> bool:
+        """Raise CircuitOpenError unless a request may be sent now, True for the probe"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.reject()
+
+    def reject(self):
+        SCRAPER_CIRCUIT_REJECTED.labels(self.host).inc()
+        raise CircuitOpenError(f"Circuit open for {self.host} after {self.failures} consecutive failures")
+
+    def record(self, ok: bool):
+        """Outcome of a request let through by allow()"""
+        self._probing = False
+        if ok:
+            self.failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.host} closed, host recovered")
+                self._set_state(CLOSED)
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                logger.error(f"Circuit for {self.host} opened after {self.failures} consecutive failures, "
+                             f"probing again in {self.cooldown:.0f}s")
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def abandon_probe(self):
+        """The probe ended without an outcome (cancelled, invalid request), let the next request probe"""
+        self._probing = False
+
+    def _set_state(self, state: str):
+        self.state = state
+        SCRAPER_CIRCUIT_STATE.labels(self.host).set((CLOSED, HALF_OPEN, OPEN).index(state))
+
+class HostStats:
+    """Traffic of one host since the process started"""
+    __slots__ = ("requests", "errors", "rejected", "bytes_received", "bytes_decoded", "throttled_seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        # Failed fast by the circuit breaker (not sent)
+        self.rejected = 0
+        # On the wire (compressed) and after decompression
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        # Time requests waited for the rate limiter (summed over concurrent requests)
+        self.throttled_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: round(getattr(self, name), 1) for name in self.__slots__}
+
+class HTTPClient:
+    """Scraper-facing view of the shared pools with its own default timeout and headers"""
+    def __init__(self, registry: "ClientRegistry", timeout: float = 30.0, headers: Optional[Dict[str, str]] = None):
+        self.registry = registry
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if self.headers:
+            kwargs["headers"] = {**self.headers, **(kwargs.get("headers") or {})}
+        return await self.registry.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+class ClientRegistry:
+    """
+    Pooled httpx clients shared by all scrapers: one AsyncClient per host, so
+    connections (HTTP/2 when available) are kept alive across scrapers and sync runs,
+    with per-host limits on requests in flight and on request rate (RateLimiter),
+    a circuit breaker per host (CircuitBreaker) and per-host traffic accounting.
+    Clients are bound to an event loop and are recreated when the loop changes;
+    breakers are not, a host that went down stays failed-fast until a probe succeeds.
+    """
+    def __init__(self):
+        self.stats: Dict[str, HostStats] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self.rate_limiters: Dict[str, RateLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def client(self, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None) -> HTTPClient:
+        return HTTPClient(self, timeout, headers)
+
+    def _pool(self, host: str) -> Tuple[httpx.AsyncClient, asyncio.Semaphore, RateLimiter]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections (and locks) of a previous (closed) loop cannot be reused
+            self._clients, self._limits, self.rate_limiters, self._loop = {}, {}, {}, loop
+        if host not in self._clients:
+            limit = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+            self._limits[host] = asyncio.Semaphore(limit)
+            self.rate_limiters[host] = RateLimiter(host, *HOST_RATES.get(host, DEFAULT_HOST_RATE))
+            self._clients[host] = httpx.AsyncClient(
+                http2=HTTP2,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit,
+                                    keepalive_expiry=KEEPALIVE_EXPIRY),
+                event_hooks=HTTPX_EVENT_HOOKS,
+            )
+        return self._clients[host], self._limits[host], self.rate_limiters[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(host, *HOST_BREAKERS.get(host, DEFAULT_BREAKER))
+        return self.breakers[host]
+
+    async def request(self, method: str, url: str, timeout: Any = 30.0, **kwargs) -> httpx.Response:
+        host = urlsplit(url).hostname or "unknown"
+        client, limit, rate_limiter = self._pool(host)
+        stats = self.stats.setdefault(host, HostStats())
+        breaker = self.breaker(host)
+        probe = recorded = False
+        if isinstance(timeout, (int, float)):
+            # Waiting for a free slot is governed by the per-host limit, not the timeout
+            timeout = httpx.Timeout(timeout, pool=None)
+        try:
+            probe = breaker.allow()
+            async with limit:
+                waited = await rate_limiter.acquire()
+                if waited > 0.001:
+                    stats.throttled_seconds += waited
+                    SCRAPER_THROTTLED.labels(host).inc(waited)
+                if breaker.state != CLOSED and not probe:
+                    # Opened while this request was queued
+                    breaker.reject()
+                stats.requests += 1
+                try:
+                    response = await client.request(method, url, timeout=timeout, **kwargs)
+                except httpx.HTTPError:
+                    stats.errors += 1
+                    rate_limiter.feedback(None)
+                    breaker.record(False)
+                    recorded = True
+                    raise
+                rate_limiter.feedback(response.status_code, parse_retry_after(response.headers.get("retry-after")))
+                breaker.record(response.status_code not in BREAKER_FAILURE_STATUSES)
+                recorded = True
+        except CircuitOpenError:
+            stats.rejected += 1
+            raise
+        finally:
+            # Cancelled or failed without an outcome (e.g. httpx.InvalidURL), let the next request probe
+            if probe and not recorded:
+                breaker.abandon_probe()
+        stats.bytes_received += response.num_bytes_downloaded
+        stats.bytes_decoded += len(response.content)
+        SCRAPER_BYTES.labels(host).inc(response.num_bytes_downloaded)
+        if response.status_code >= 400:
+            stats.errors += 1
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {host: s.to_dict() for host, s in sorted(self.stats.items())}
+
+    def log_summary(self):
+        for host, s in sorted(self.stats.items(), key=lambda x: -x[1].bytes_received):
+            ratio = f", {s.bytes_decoded / s.bytes_received:.1f}x compression" if s.bytes_received else ""
+            rejected = f", {s.rejected} failed fast (circuit open)" if s.rejected else ""
+            logger.info(f"HTTP {host}: {s.requests} requests, {s.errors} errors{rejected}, "
+                        f"{s.bytes_received / 1024:.0f} KiB received{ratio}, throttled {s.throttled_seconds:.0f}s")
+
+    async def aclose(self):
+        clients, self._clients, self._limits = self._clients, {}, {}
+        for client in clients.values():
+            await client.aclose()
+
+http_clients = ClientRegistry()
@@ -1,19 +1,27 @@
-import httpx
 from bs4 import BeautifulSoup
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Dict, NamedTuple, Optional, Tuple
+from functools import partial
+import httpx
 from .. import models
-import asyncio
 import re
 import logging
-from sqlalchemy import func
+from sqlalchemy import func, select
 from .utils import MSZ_GOV_PL_MANUAL_MAPPING, clean_polish_name, slugify, get_headers, normalize_polish_text
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .http_cache import http_cache
+from .http_client import http_clients
+from .extract import extract_msz
+from .parse_pool import PARSE_PROCESSES, parse_pool
+from .pipeline import AfterCommit, Result, SetFields
 
 logger = logging.getLogger("uvicorn")
 
 class MSZScraper(BaseScraper):
-    def __init__(self, db: Session):
+    # Pages are parsed in worker processes, keep them all busy
+    parse_workers = max(1, PARSE_PROCESSES)
+
+    def __init__(self, db: AsyncSession):
         super().__init__(db, concurrency=3, timeout=60.0)
         self.url_cache = {}
 
@@ -50,8 +58,8 @@ class MSZScraper(BaseScraper):
         except Exception as e:
             logger.error(f"Error fetching MSZ directory: {e}")
 
-    async def sync_country(self, country: models.Country, depth: int = 0):
-        if country.iso_alpha2 == 'PL': return {"status": "skipped"}
+    async def fetch(self, country: models.Country):
+        if country.iso_alpha2 == 'PL': return Result(status="skipped")
 
         name_pl = clean_polish_name(country.name_pl or country.name)
         dir_url = self.url_cache.get(name_pl)
@@ -65,198 +73,173 @@ class MSZScraper(BaseScraper):
             strategies.append(("manual-modern", f"https://www.gov.pl/web/{manual_slug}/idp"))
         strategies.append(("modern", f"https://www.gov.pl/web/{simple_slug}/idp"))
 
-        response_text, final_url = None, ""
         for _, url in strategies:
             try:
-                await asyncio.sleep(0.5)
-                resp = await self.client.get(url, headers=get_headers())
+                # Only the page used last time has validators, a 304 means it is unchanged
+                resp = await self.client.get(url, headers={**get_headers(), **http_cache.headers(url)})
+                if resp.status_code == 304:
+                    return Result(status="unchanged")
                 if resp.status_code == 200:
                     curr_url = str(resp.url).rstrip('/')
                     if curr_url not in ["https://www.gov.pl", "https://www.gov.pl/web/dyplomacja/informacje-dla-podrozujacych"]:
                         if any(kw in resp.text.lower() for kw in ["bezpieczeństwo", "ostrzeżenia", "idp"]):
-                            response_text, final_url = resp.text, str(resp.url)
-                            break
-            except: continue
-
-        if not response_text:
-            if country.parent_id:
-                return await self.parent_fallback(country, depth)
-            return {"error": "No valid MSZ page found"}
-
-        soup = BeautifulSoup(response_text, 'html.parser')
-        risk_level = self._parse_risk_level(soup, country)
-        
-        # Parse all sections
-        self._update_safety(country, soup, risk_level, final_url)
-        self._update_entry(country, soup)
-        self._update_practical(country, soup)
-        self._update_customs(country, soup)
-        
-        self.db.commit()
-        return {"status": "success"}
-
-    def _update_customs(self, country: models.Country, soup: BeautifulSoup):
-        practical = self.db.query(models.PracticalInfo).filter(models.PracticalInfo.country_id == country.id).first()
-        if not practical:
-            practical = models.PracticalInfo(country_id=country.id)
-            self.db.add(practical)
-
-        # Look for "Cło" section
-        customs_text = ""
-        
-        # Strategy 1: Find by ID or header text
-        headers = soup.find_all(['h2', 'h3', 'h4'])
-        for h in headers:
-            if 'cło' in h.get_text().lower():
-                # Get next siblings until next header
-                content = []
-                curr = h.find_next_sibling()
-                while curr and curr.name not in ['h2', 'h3', 'h4']:
-                    content.append(curr.get_text().strip())
-                    curr = curr.find_next_sibling()
-                customs_text = "\n".join(filter(None, content))
-                break
-        
-        # Strategy 2: Search in whole text if nothing found
-        if not customs_text:
-            text = soup.get_text()
-            match = re.search(r'Cło(.*?)(Ubezpieczenie|Zdrowie|Religia|Wizy|Waluta|$)', text, re.S | re.I)
-            if match:
-                customs_text = match.group(1).strip()
-
-        # Add EU info if applicable
-        eu_members = ['AT', 'BE', 'BG', 'HR', 'CY', 'CZ', 'DK', 'EE', 'FI', 'FR', 'DE', 'GR', 'HU', 'IE', 'IT', 'LV', 'LT', 'LU', 'MT', 'NL', 'PL', 'PT', 'RO', 'SK', 'SI', 'ES', 'SE']
-        eu_import_limits = "\n\n**Limity wwozowe do UE (z krajów poza UE):**\n- Wyroby tytoniowe: 200 papierosów lub 50 cygar.\n- Alkohol: 1L mocnego (>22%) lub 4L wina spokojnego i 16L piwa.\n- Inne: zakaz wwożenia mięsa i nabiału (serów) z większości krajów poza UE."
-        
-        if country.iso_alpha2 in eu_members:
-            eu_intra_limits = "**Limity wewnątrzunijne (dla podróżnych):** 800 papierosów, 10L spirytusu, 20L wina wzmocnionego, 90L wina, 110L piwa."
-            customs_text = f"{eu_intra_limits}\n\n{customs_text}".strip()
-        else:
-            customs_text = f"{customs_text}\n\n{eu_import_limits}".strip()
-
-        if customs_text:
-            practical.customs_rules = normalize_polish_text(customs_text)
-
-    def _parse_risk_level(self, soup: BeautifulSoup, country: models.Country) -> tuple[str, bool]:
-        risk_container = soup.select_one('.travel-advisory--risk-level') or soup.select_one('.safety-level')
-        risk_level = 'low'
-        is_partial = False
-
-        if risk_container:
-            text = risk_container.get_text().lower()
-            if 'zachowaj zwykłą ostrożność' in text: risk_level = 'low'
-            elif 'zachowaj szczególną ostrożność' in text: risk_level = 'medium'
-            elif 'odradzamy podróże, które nie są konieczne' in text: risk_level = 'high'
-            elif 'odradzamy wszelkie podróże' in text: risk_level = 'critical'
-        
-        # Text-based fallback/override
-        page_text = soup.get_text().lower()
-        
-        # Check for partial territory warnings (often seen in Turkey, Egypt)
-        # We look for the "rest of territory" phrase which defines the base level
-        # This regex covers many variations including "na pozostałym terytorium Turcji/kraju/itp."
-        rest_pattern = r'na pozostałym terytorium.*?(zalecamy\s+)?(zachowanie|zachować)\s+(.*?)(\.|$)'
-        rest_of_territory_match = re.search(rest_pattern, page_text, re.S | re.I)
-        
-        if rest_of_territory_match:
-            rest_text = rest_of_territory_match.group(3).lower()
-            is_partial = True
-            if 'zwykłej ostrożności' in rest_text: risk_level = 'low'
-            elif 'szczególnej ostrożności' in rest_text: risk_level = 'medium'
-            elif 'odradzamy podróże' in rest_text: risk_level = 'high'
-        else:
-            if re.search(r'odradza(my)? wszelkie podróże|bezwzględnie odradza(my)?', page_text, re.I):
-                risk_level = 'critical'
-            elif re.search(r'odradza(my)? podróże.*?które nie są konieczne', page_text, re.I | re.S):
-                if risk_level in ['low', 'medium']: risk_level = 'high'
-        
-        return risk_level, is_partial
-
-    def _update_safety(self, country, soup, risk_data, url):
-        risk_level, is_partial = risk_data
-        safety = self.db.query(models.SafetyInfo).filter(models.SafetyInfo.country_id == country.id).first()
-        if not safety:
-            safety = models.SafetyInfo(country_id=country.id)
-            self.db.add(safety)
-        
-        # Simple summary extraction
-        summary = ""
-        # Try to find the bolded warning summary
-        strong_elements = soup.find_all('strong')
-        
-        warnings = []
-        for s in strong_elements:
-            t = s.get_text().strip()
-            if any(kw in t.lower() for kw in ['odradza', 'zachowaj', 'zalecamy']):
-                if len(t) > 20: # Avoid short fragments
-                    warnings.append(t)
-        
-        labels = {
-            'low': 'zachowanie zwykłej ostrożności', 
-            'medium': 'zachowanie szczególnej ostrożności', 
-            'high': 'odradzane podróże, które nie są konieczne', 
-            'critical': 'odradzane wszelkie podróże'
-        }
-
-        if is_partial:
-            # If partial, we want the summary to reflect the BASE level but mention partiality
-            base_advice = labels.get(risk_level, 'zachowanie ostrożności')
-            summary = f"MSZ zaleca {base_advice} na większości terytorium (ostrzeżenia punktowe)."
-        else:
-            # If NOT partial, we should prioritize the label-based summary to avoid
-            # picking up a specific warning (like 'be careful when swimming') as the main level
-            summary = f"Ministerstwo Spraw Zagranicznych zaleca {labels.get(risk_level, 'zachowanie ostrożności')}."
-            
-            # Optional: if there's a strong warning in the text, we can still try to find it
-            # but ONLY if it matches the risk_level we found.
-            if warnings:
-                for w in warnings:
-                    w_lower = w.lower()
-                    if risk_level == 'critical' and 'odradza wszelkie' in w_lower: summary = w; break
-                    if risk_level == 'high' and 'odradza podróże' in w_lower: summary = w; break
-                    if risk_level == 'medium' and 'szczególną ostrożność' in w_lower: summary = w; break
-                    if risk_level == 'low' and 'zwykłą ostrożność' in w_lower: summary = w; break
-
-        safety.risk_level = risk_level
-        safety.is_partial = is_partial
-        safety.summary = normalize_polish_text(summary)
-        safety.full_url = url
-        safety.last_checked = func.now()
-
-    def _update_entry(self, country, soup):
-        entry = self.db.query(models.EntryRequirement).filter(models.EntryRequirement.country_id == country.id).first()
-        if not entry:
-            entry = models.EntryRequirement(country_id=country.id)
-            self.db.add(entry)
+                            return url, resp
+            except Exception: continue
+
+        return Result(error="No valid MSZ page found", not_found=True)
+
+    async def parse(self, country: models.Country, page: Tuple[str, httpx.Response]):
+        url, resp = page
+        advisory = await parse_pool.run(parse_advisory, resp.text, country.iso_alpha2)
+        customs = {"customs_rules": advisory.customs_rules} if advisory.customs_rules else {}
+        return [
+            SetFields(models.SafetyInfo, {
+                "risk_level": advisory.risk_level,
+                "is_partial": advisory.is_partial,
+                "summary": advisory.summary,
+                "full_url": str(resp.url),
+                "last_checked": func.now(),
+            }),
+            SetFields(models.EntryRequirement, self._entry_values(country)),
+            SetFields(models.PracticalInfo, {**customs, "last_updated": func.now()}),
+            AfterCommit(partial(http_cache.store, url, resp)),
+        ]
+
+    def _entry_values(self, country) -> Dict[str, Any]:
+        values = {"last_updated": func.now()}
         
         # Default logic for Europe
         if country.continent == 'Europe' and country.iso_alpha2 not in ['BY', 'RU', 'UA', 'GB']:
-            entry.id_card_allowed = True
-            entry.visa_required = False
+            values["id_card_allowed"] = True
+            values["visa_required"] = False
         
-        entry.last_updated = func.now()
-
-    def _update_practical(self, country, soup):
-        practical = self.db.query(models.PracticalInfo).filter(models.PracticalInfo.country_id == country.id).first()
-        if not practical:
-            practical = models.PracticalInfo(country_id=country.id)
-            self.db.add(practical)
-        practical.last_updated = func.now()
+        return values
 
     async def run(self, countries: List[models.Country]) -> Dict[str, int]:
-        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
-            self.client = client
-            await self.fetch_directory()
-            tasks = [self._limited_sync(country, {"success": 0, "errors": 0}) for country in countries]
-            # Custom run because we need to return results
-            results = {"success": 0, "errors": 0}
-            for task in asyncio.as_completed(tasks):
-                await task # _limited_sync updates shared results dict if passed, but here it's easier to just track
-            # Redoing run to match BaseScraper but with directory fetch
-            return await super().run(countries)
-
-async def scrape_all_with_cache(db: Session):
-    countries = db.query(models.Country).all()
+        # Directory first, then the regular per-country run
+        self.client = http_clients.client(self.timeout)
+        await self.fetch_directory()
+        return await super().run(countries)
+
+class Advisory(NamedTuple):
+    """What parse() reads from an MSZ country page"""
+    risk_level: str
+    is_partial: bool
+    summary: str
+    customs_rules: Optional[str]
+
+def parse_advisory(html: str, iso2: str, engine: Optional[str] = None) -> Advisory:
+    """Parse an MSZ country page (runs in a parse worker process)"""
+    page = extract_msz(html, engine)
+    risk_level, is_partial = _risk_level(page.risk_text, page.page_text)
+    return Advisory(risk_level, is_partial, _summary(page.strong_texts, risk_level, is_partial),
+                    _customs_rules(page.customs_section, page.page_text, iso2))
+
+def _customs_rules(customs_section: str, page_text: str, iso2: str) -> Optional[str]:
+    # Strategy 1: the section under the "Cło" header
+    customs_text = customs_section
+
+    # Strategy 2: Search in whole text if nothing found
+    if not customs_text:
+        match = re.search(r'Cło(.*?)(Ubezpieczenie|Zdrowie|Religia|Wizy|Waluta|$)', page_text, re.S | re.I)
+        if match:
+            customs_text = match.group(1).strip()
+
+    # Add EU info if applicable
+    eu_members = ['AT', 'BE', 'BG', 'HR', 'CY', 'CZ', 'DK', 'EE', 'FI', 'FR', 'DE', 'GR', 'HU', 'IE', 'IT', 'LV', 'LT', 'LU', 'MT', 'NL', 'PL', 'PT', 'RO', 'SK', 'SI', 'ES', 'SE']
+    eu_import_limits = "\n\n**Limity wwozowe do UE (z krajów poza UE):**\n- Wyroby tytoniowe: 200 papierosów lub 50 cygar.\n- Alkohol: 1L mocnego (>22%) lub 4L wina spokojnego i 16L piwa.\n- Inne: zakaz wwożenia mięsa i nabiału (serów) z większości krajów poza UE."
+
+    if iso2 in eu_members:
+        eu_intra_limits = "**Limity wewnątrzunijne (dla podróżnych):** 800 papierosów, 10L spirytusu, 20L wina wzmocnionego, 90L wina, 110L piwa."
+        customs_text = f"{eu_intra_limits}\n\n{customs_text}".strip()
+    else:
+        customs_text = f"{customs_text}\n\n{eu_import_limits}".strip()
+
+    return normalize_polish_text(customs_text) if customs_text else None
+
+def _risk_level(risk_text: Optional[str], page_text: str) -> tuple[str, bool]:
+    risk_level = 'low'
+    is_partial = False
+
+    if risk_text is not None:
+        text = risk_text.lower()
+        if 'zachowaj zwykłą ostrożność' in text: risk_level = 'low'
+        elif 'zachowaj szczególną ostrożność' in text: risk_level = 'medium'
+        elif 'odradzamy podróże, które nie są konieczne' in text: risk_level = 'high'
+        elif 'odradzamy wszelkie podróże' in text: risk_level = 'critical'
+
+    # Text-based fallback/override
+    page_text = page_text.lower()
+
+    # Check for partial territory warnings (often seen in Turkey, Egypt)
+    # We look for the "rest of territory" phrase which defines the base level
+    # This regex covers many variations including "na pozostałym terytorium Turcji/kraju/itp."
+    rest_pattern = r'na pozostałym terytorium.*?(zalecamy\s+)?(zachowanie|zachować)\s+(.*?)(\.|$)'
+    rest_of_territory_match = re.search(rest_pattern, page_text, re.S | re.I)
+
+    if rest_of_territory_match:
+        rest_text = rest_of_territory_match.group(3).lower()
+        is_partial = True
+        if 'zwykłej ostrożności' in rest_text: risk_level = 'low'
+        elif 'szczególnej ostrożności' in rest_text: risk_level = 'medium'
+        elif 'odradzamy podróże' in rest_text: risk_level = 'high'
+    else:
+        if re.search(r'odradza(my)? wszelkie podróże|bezwzględnie odradza(my)?', page_text, re.I):
+            risk_level = 'critical'
+        elif re.search(r'odradza(my)? podróże.*?które nie są konieczne', page_text, re.I | re.S):
+            if risk_level in ['low', 'medium']: risk_level = 'high'
+
+    return risk_level, is_partial
+
+def _summary(strong_texts: List[str], risk_level: str, is_partial: bool) -> str:
+    # Simple summary extraction
+    summary = ""
+
+    # Try to find the bolded warning summary
+    warnings = []
+    for t in strong_texts:
+        if any(kw in t.lower() for kw in ['odradza', 'zachowaj', 'zalecamy']):
+            if len(t) > 20: # Avoid short fragments
+                warnings.append(t)
+
+    labels = {
+        'low': 'zachowanie zwykłej ostrożności', 
+        'medium': 'zachowanie szczególnej ostrożności', 
+        'high': 'odradzane podróże, które nie są konieczne', 
+        'critical': 'odradzane wszelkie podróże'
+    }
+
+    if is_partial:
+        # If partial, we want the summary to reflect the BASE level but mention partiality
+        base_advice = labels.get(risk_level, 'zachowanie ostrożności')
+        summary = f"MSZ zaleca {base_advice} na większości terytorium (ostrzeżenia punktowe)."
+    else:
+        # If NOT partial, we should prioritize the label-based summary to avoid
+        # picking up a specific warning (like 'be careful when swimming') as the main level
+        summary = f"Ministerstwo Spraw Zagranicznych zaleca {labels.get(risk_level, 'zachowanie ostrożności')}."
+
+        # Optional: if there's a strong warning in the text, we can still try to find it
+        # but ONLY if it matches the risk_level we found.
+        if warnings:
+            for w in warnings:
+                w_lower = w.lower()
+                if risk_level == 'critical' and 'odradza wszelkie' in w_lower: summary = w; break
+                if risk_level == 'high' and 'odradza podróże' in w_lower: summary = w; break
+                if risk_level == 'medium' and 'szczególną ostrożność' in w_lower: summary = w; break
+                if risk_level == 'low' and 'zwykłą ostrożność' in w_lower: summary = w; break
+
+    return normalize_polish_text(summary)
+
+async def scrape_all_with_cache(db: AsyncSession):
+    countries = await load_countries(db)
     scraper = MSZScraper(db)
     # We call run which handles client and directory
     return await scraper.run(countries)
+
+async def scrape_country(db: AsyncSession, iso2: str):
+    """Scrape MSZ data for a single country"""
+    scraper = MSZScraper(db)
+    result = await scraper.execute(select(models.Country).where(models.Country.iso_alpha2 == iso2.upper()))
+    country = result.scalars().first()
+    if not country: return {"error": "Country not found"}
+    return await scraper.run([country])
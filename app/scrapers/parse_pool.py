@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("uvicorn")
+
+# Worker processes parsing HTML pages, 0 parses on the event loop (debugging)
+PARSE_PROCESSES = int(os.environ.get("PARSE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+class ParsePool:
+    """
+    Runs CPU-bound HTML parsing in worker processes, so the event loop keeps reading
+    responses while pages are parsed and parsing uses more than one core. Parse
+    functions must be module-level (they are pickled by name), take the page text and
+    plain values, and return plain records (NamedTuples) rather than soup objects.
+    """
+    def __init__(self, processes: int = PARSE_PROCESSES):
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.processes <= 0:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory), start a new pool for later pages
+            logger.warning(f"Parse worker pool broke, restarting it ({func.__name__})")
+            self.shutdown()
+            return await loop.run_in_executor(self._pool(), func, *args)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Not fork: the API process runs threads (translations, uvicorn) that a fork would copy mid-state
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+parse_pool = ParsePool()
@@ -0,0 +1,37 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+# What fetch()/parse() of a pipelined scraper return (see BaseScraper): parse() turns a
+# fetched payload into write operations, which the pipeline's single writer applies to
+# the country in batched transactions. Scrapers never touch the session themselves.
+
+class Result(NamedTuple):
+    """Outcome of a country decided without writes (returned by fetch or parse)"""
+    status: str = "success"
+    error: Optional[str] = None
+    # The source has no page for the country, the pipeline tries its parent country
+    not_found: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": self.error} if self.error else {"status": self.status}
+
+class ReplaceRows(NamedTuple):
+    """
+    Replace the country's rows of model (rows without country_id). With a source, the
+    rows are hashed and nothing is written when they match the last write (source_hashes).
+    """
+    model: Type
+    rows: List[Dict[str, Any]]
+    source: Optional[str] = None
+    # Extra conditions limiting the rows deleted (e.g. one year of holidays)
+    where: Tuple = ()
+    # Hashed instead of rows when given (e.g. holidays, hashed before translation)
+    hashed: Any = None
+
+class SetFields(NamedTuple):
+    """Set columns of the country's one-to-one row of model (created when missing), or of the Country"""
+    model: Type
+    values: Dict[str, Any]
+
+class AfterCommit(NamedTuple):
+    """Call once the country's writes are committed (e.g. remember HTTP validators)"""
+    callback: Callable[[], Any]
@@ -1,26 +1,27 @@
-import httpx
 from sqlalchemy.orm import Session
 from .. import models
 import logging
 import asyncio
 from sqlalchemy.sql import func
-from .utils import translate_to_pl, get_headers, normalize_polish_text
+from .utils import get_headers, normalize_polish_text
+from .content_hash import changed_hash, content_hash, save_hash
+from .translations import translation_memory
+from .http_client import http_clients
 
 logger = logging.getLogger("uvicorn")
 
 async def fetch_data(url):
-    async with httpx.AsyncClient(timeout=40.0, follow_redirects=True) as client:
-        for attempt in range(3):
-            try:
-                resp = await client.get(url, headers=get_headers())
-                if resp.status_code == 200:
-                    return resp.json()
-                else:
-                    logger.error(f"Attempt {attempt+1}: REST Countries returned {resp.status_code}")
-                    if attempt < 2: await asyncio.sleep(2)
-            except Exception as e:
-                logger.error(f"Attempt {attempt+1} failed: {e}")
+    for attempt in range(3):
+        try:
+            resp = await http_clients.get(url, headers=get_headers(), timeout=40.0)
+            if resp.status_code == 200:
+                return resp.json()
+            else:
+                logger.error(f"Attempt {attempt+1}: REST Countries returned {resp.status_code}")
                 if attempt < 2: await asyncio.sleep(2)
+        except Exception as e:
+            logger.error(f"Attempt {attempt+1} failed: {e}")
+            if attempt < 2: await asyncio.sleep(2)
     return None
 
 def normalize_polish_name(name: str, iso2: str = None) -> str:
@@ -31,6 +32,12 @@ def normalize_polish_name(name: str, iso2: str = None) -> str:
         return 'Wielka Brytania'
     return normalize_polish_text(name)
 
+def main_currency(country_data: dict):
+    """[code, info] of the first currency, the one stored (None without currencies)"""
+    currencies = country_data.get("currencies") or {}
+    main_code = next(iter(currencies), None)
+    return [main_code, currencies[main_code]] if main_code else None
+
 async def sync_countries(db: Session):
     """
     Syncs base country list from REST Countries API.
@@ -61,6 +68,22 @@ async def sync_countries(db: Session):
         if item['cca2'] in merged_data:
             merged_data[item['cca2']].update(item)
 
+    # Languages and currencies are hashed before translation: only the names of those
+    # changed since the last write are translated, up front in batches off the event loop
+    stored = {(iso2, source): digest for iso2, source, digest in db.query(
+        models.Country.iso_alpha2, models.SourceHash.source, models.SourceHash.hash
+    ).join(models.SourceHash, models.SourceHash.country_id == models.Country.id)}
+    names = []
+    for iso2, item in merged_data.items():
+        langs = item.get("languages") or {}
+        if langs and stored.get((iso2, "languages")) != content_hash(langs):
+            names.extend(langs.values())
+        currency = main_currency(item)
+        if currency and stored.get((iso2, "currencies")) != content_hash(currency):
+            names.append(currency[1].get("name"))
+    translation_memory.load(db)
+    names_pl = await translation_memory.translate_many_async(names)
+
     results = {"synced": 0, "updated": 0, "skipped": 0, "errors": []}
     
     # Manual parent mapping
@@ -142,39 +165,44 @@ async def sync_countries(db: Session):
                 country.updated_at = func.now()
                 results["updated"] += 1
 
-            # Languages
+            # Languages and currencies are only rewritten when the API data changed
             langs = country_data.get("languages", {})
-            if langs:
+            digest = changed_hash(db, country.id, "languages", langs) if langs else None
+            if digest:
                 db.query(models.Language).filter(models.Language.country_id == country.id).delete()
                 for code, name in langs.items():
                     db.add(models.Language(
                         country_id=country.id,
-                        name=translate_to_pl(name),
+                        name=names_pl.get(name, name),
                         code=code,
                         is_official=True,
                         last_updated=func.now()
                     ))
+                save_hash(db, country.id, "languages", digest)
 
             # Currencies
-            currencies = country_data.get("currencies", {})
-            if currencies:
+            # Tylko główna waluta, aby uniknąć ostrzeżeń SQLAlchemy uselist=False
+            currency = main_currency(country_data)
+            digest = changed_hash(db, country.id, "currencies", currency) if currency else None
+            if digest:
                 db.query(models.Currency).filter(models.Currency.country_id == country.id).delete()
-                # Tylko główna waluta, aby uniknąć ostrzeżeń SQLAlchemy uselist=False
-                main_code = next(iter(currencies))
-                info = currencies[main_code]
+                main_code, info = currency
                 db.add(models.Currency(
                     country_id=country.id,
                     code=main_code,
-                    name=translate_to_pl(info.get("name")),
+                    name=names_pl.get(info.get("name"), info.get("name")),
                     symbol=info.get("symbol"),
                     last_updated=func.now()
                 ))
+                save_hash(db, country.id, "currencies", digest)
         except Exception as e:
             err_msg = f"Error processing country {iso2}: {str(e)}"
             logger.error(err_msg)
             results["errors"].append(err_msg)
 
+    translation_memory.save(db)
     db.commit()
+    translation_memory.saved()
     
     # Second pass for parent mapping
     logger.info("Updating parent/territory relationships...")
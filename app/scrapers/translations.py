@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .. import models
+from .upsert import insert_missing
+from .utils import CURRENCY_FIXES, normalize_polish_text
+
+logger = logging.getLogger("uvicorn")
+
+# Google Translate accepts up to 5000 characters per request
+MAX_BATCH_CHARS = 4500
+# Longer texts are translated but not stored (column size)
+MAX_TEXT_LENGTH = 500
+# Threads running translation requests for async callers
+TRANSLATION_WORKERS = int(os.environ.get("TRANSLATION_WORKERS", "4"))
+
+def _chunks(texts: List[str], max_chars: int = MAX_BATCH_CHARS) -> Iterable[List[str]]:
+    chunk, size = [], 0
+    for text in texts:
+        if chunk and size + len(text) + 1 > max_chars:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text) + 1
+    if chunk:
+        yield chunk
+
+def machine_translate(texts: List[str]) -> Dict[str, str]:
+    """
+    Translate to Polish with as few requests as possible: texts are sent newline-joined,
+    a chunk whose lines do not come back one-to-one is translated text by text.
+    Texts that could not be translated are left out.
+    """
+    # Imported on first use, the translator is heavy and most scrapers never need it
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source='auto', target='pl')
+    translated = {}
+    for chunk in _chunks(texts):
+        try:
+            lines = (translator.translate("\n".join(chunk)) or "").split("\n")
+        except Exception as e:
+            logger.error(f"Batch translation of {len(chunk)} texts failed: {e}")
+            lines = []
+        if len(lines) == len(chunk):
+            translated.update(zip(chunk, lines))
+            continue
+        for text in chunk:
+            try:
+                translated[text] = translator.translate(text)
+            except Exception as e:
+                logger.error(f"Translation error for '{text}': {e}")
+    return translated
+
+class TranslationMemory:
+    """
+    Translations of translate_to_pl persisted in the translations table. Manual rows
+    (seeded from CURRENCY_FIXES) override machine translations and also fix known bad
+    machine output. Rows are read once per process with load(), new machine
+    translations are kept until save() writes them in the caller's transaction and
+    saved() confirms its commit, so they are committed with the data that uses them. Without load() it is a plain in-memory cache.
+
+    Async callers use translate_many_async(): requests run on a bounded thread pool so
+    the event loop keeps serving other fetches, and a text already being translated
+    for another caller is awaited instead of requested again.
+    """
+    def __init__(self):
+        self.entries: Dict[str, str] = dict(CURRENCY_FIXES)
+        self.manual: Dict[str, str] = dict(CURRENCY_FIXES)
+        self.loaded = False
+        self._pending: Dict[str, str] = {}
+        # Written by the last save(), dropped from _pending once the caller committed them
+        self._saving: Dict[str, str] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Texts being translated -> future resolved when their translation is in entries
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def load(self, db: Session):
+        """Read the stored translations and add missing manual overrides (once)"""
+        if self.loaded:
+            return
+        rows = {row.source_text: row for row in db.execute(select(models.Translation)).scalars()}
+        for text, fix in CURRENCY_FIXES.items():
+            row = rows.get(text)
+            if row is None:
+                row = rows[text] = models.Translation(source_text=text)
+                db.add(row)
+            if row.translated != fix or not row.is_manual:
+                row.translated, row.is_manual = fix, True
+        self.manual = {text: row.translated for text, row in rows.items() if row.is_manual}
+        self.entries = {text: row.translated for text, row in rows.items()}
+        # Translated before the first load, keep those not stored yet
+        self._pending = {t: v for t, v in self._pending.items() if t not in rows}
+        self.entries.update(self._pending)
+        self.loaded = True
+        logger.info(f"Loaded {len(self.entries)} translations ({len(self.manual)} manual)")
+
+    def translate_many(self, texts: Iterable[str]) -> Dict[str, str]:
+        """Translations of texts, the unknown ones deduplicated and machine-translated in batches"""
+        texts = list(texts)
+        missing = list(dict.fromkeys(t for t in texts if t and t not in self.entries))
+        if missing:
+            logger.info(f"Translating {len(missing)} new texts")
+            self._remember(machine_translate(missing))
+        return {t: self.entries.get(t, t) for t in texts if t}
+
+    async def translate_many_async(self, texts: Iterable[str]) -> Dict[str, str]:
+        """translate_many() without blocking the event loop, coalescing concurrent requests"""
+        texts = list(dict.fromkeys(t for t in texts if t))
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures of a previous (closed) loop can never complete
+            self._inflight, self._loop = {}, loop
+        waiting = [self._inflight[t] for t in texts if t in self._inflight]
+        missing = [t for t in texts if t not in self.entries and t not in self._inflight]
+        if missing:
+            futures = {t: loop.create_future() for t in missing}
+            self._inflight.update(futures)
+            logger.info(f"Translating {len(missing)} new texts")
+            try:
+                self._remember(await loop.run_in_executor(self._pool(), machine_translate, missing))
+            finally:
+                for text, future in futures.items():
+                    del self._inflight[text]
+                    # Waiters fall back to the original text when the translation failed
+                    if not future.done():
+                        future.set_result(None)
+        if waiting:
+            await asyncio.gather(*waiting)
+        return {t: self.entries.get(t, t) for t in texts}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(TRANSLATION_WORKERS, thread_name_prefix="translate")
+        return self._executor
+
+    def _remember(self, translations: Dict[str, Optional[str]]):
+        for text, translated in translations.items():
+            translated = normalize_polish_text(translated)
+            # Failed translation: callers fall back to the source text, retried next run
+            if not translated:
+                continue
+            translated = self.manual.get(translated, translated)
+            self.entries[text] = self._pending[text] = translated
+
+    def translate(self, text: str) -> str:
+        if not text: return text
+        return self.translate_many([text]).get(text, text)
+
+    def save(self, db: Session):
+        """
+        Write translations not stored yet in the caller's transaction; the caller calls
+        saved() after the commit. Texts another process stored meanwhile are left as they are.
+        """
+        self.load(db)
+        self._saving = dict(self._pending)
+        insert_missing(db, models.Translation, [
+            {"source_text": text, "translated": translated} for text, translated in self._saving.items()
+            if translated and len(text) <= MAX_TEXT_LENGTH and len(translated) <= MAX_TEXT_LENGTH
+        ], ("source_text",))
+
+    def saved(self):
+        """The transaction of the last save() is committed, keep only newer translations pending"""
+        for text, translated in self._saving.items():
+            if self._pending.get(text) == translated:
+                del self._pending[text]
+        self._saving = {}
+
+translation_memory = TranslationMemory()
@@ -1,9 +1,10 @@
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Any, List
 
 from .. import models
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
 
 logger = logging.getLogger("uvicorn")
 
@@ -87,7 +88,7 @@ class TransportAppsScraper(BaseScraper):
     """
     Updates popular_apps column with transport-specific data.
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 30.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 30.0):
         super().__init__(db, concurrency, timeout)
 
     async def sync_country(self, country: models.Country) -> Any:
@@ -114,16 +115,15 @@ class TransportAppsScraper(BaseScraper):
                 apps = REGIONAL_APPS.get(country.continent, "Uber, Bolt")
         
         # Update database
-        country.popular_apps = apps
-        self.db.commit()
+        await self.update(country, popular_apps=apps)
         return {"status": "success"}
 
-async def sync_transport_apps(db: Session):
+async def sync_transport_apps(db: AsyncSession):
     """
     Legacy wrapper for syncing transport apps.
     """
     scraper = TransportAppsScraper(db)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db, selectinload(models.Country.practical))
     results = await scraper.run(countries)
     logger.info(f"Synced transport apps for {results['success']} countries")
     return {"success": results["success"]}
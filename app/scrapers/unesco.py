@@ -1,15 +1,17 @@
-import httpx
 import logging
 import json
 import os
 import re
 import asyncio
 from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
 from .. import models
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .pipeline import ReplaceRows, SetFields
+from .http_client import http_clients
 
 logger = logging.getLogger("uvicorn")
 
@@ -26,7 +28,7 @@ class UnescoScraper(BaseScraper):
     """
     Syncs UNESCO World Heritage Sites from UNESCO Open Data API.
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 60.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 60.0):
         super().__init__(db, concurrency, timeout)
         self.unesco_data_dict: Dict[str, List[Dict[str, Any]]] = {}
 
@@ -44,32 +46,31 @@ class UnescoScraper(BaseScraper):
             "Accept": "application/json"
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
-            self.client = client
-            while total_count is None or offset < total_count:
-                url = f"{UNESCO_API_BASE_URL}?select={FIELDS}&limit={limit}&offset={offset}&lang=en"
-                logger.info(f"Fetching UNESCO API: offset={offset}...")
+        self.client = http_clients.client(self.timeout)
+        while total_count is None or offset < total_count:
+            url = f"{UNESCO_API_BASE_URL}?select={FIELDS}&limit={limit}&offset={offset}&lang=en"
+            logger.info(f"Fetching UNESCO API: offset={offset}...")
                 
-                try:
-                    resp = await self.client.get(url, headers=headers)
-                    if resp.status_code != 200:
-                        logger.error(f"UNESCO API error: HTTP {resp.status_code}")
-                        break
-                    
-                    data = resp.json()
-                    if total_count is None:
-                        total_count = data.get("total_count", 0)
+            try:
+                resp = await self.client.get(url, headers=headers)
+                if resp.status_code != 200:
+                    logger.error(f"UNESCO API error: HTTP {resp.status_code}")
+                    break
                     
-                    results = data.get("results", [])
-                    if not results:
-                        break
+                data = resp.json()
+                if total_count is None:
+                    total_count = data.get("total_count", 0)
                     
-                    all_results.extend(results)
-                    offset += len(results)
-                    await asyncio.sleep(0.1)
-                except Exception as e:
-                    logger.error(f"Error at offset {offset}: {e}")
+                results = data.get("results", [])
+                if not results:
                     break
+                    
+                all_results.extend(results)
+                offset += len(results)
+                await asyncio.sleep(0.1)
+            except Exception as e:
+                logger.error(f"Error at offset {offset}: {e}")
+                break
         
         if not all_results:
             return {"success": 0, "errors": 1}
@@ -85,11 +86,7 @@ class UnescoScraper(BaseScraper):
         except Exception as e:
             logger.error(f"Could not save backup file: {e}")
 
-        results = {"success": 0, "errors": 0}
-        tasks = [self._limited_sync(country, results) for country in countries]
-        await asyncio.gather(*tasks)
-        
-        return results
+        return await super().run(countries)
 
     def _parse_unesco_records(self, records: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Parse API records into a dictionary indexed by ISO alpha-2 codes"""
@@ -130,39 +127,31 @@ class UnescoScraper(BaseScraper):
                     unesco_data_dict[iso].append(site_obj)
         return unesco_data_dict
 
-    async def sync_country(self, country: models.Country) -> Any:
-        sites = self.unesco_data_dict.get(country.iso_alpha2.upper(), [])
-        
-        try:
-            self.db.query(models.UnescoPlace).filter(models.UnescoPlace.country_id == country.id).delete()
-            country.unesco_count = len(sites)
-            
-            for site in sites:
-                self.db.add(models.UnescoPlace(
-                    country_id=country.id,
-                    unesco_id=str(site["id"]) if site["id"] else None,
-                    name=site["name"],
-                    category=site["category"],
-                    is_danger=site.get("is_danger", False),
-                    is_transnational=site.get("is_transnational", False),
-                    image_url=site["image"],
-                    description=site["description"],
-                    last_updated=func.now()
-                ))
-            
-            self.db.commit()
-            return {"status": "success", "sites_count": len(sites)}
-        except Exception as e:
-            logger.error(f"DB Error for {country.iso_alpha2}: {e}")
-            return {"error": str(e)}
+    async def fetch(self, country: models.Country) -> List[Dict[str, Any]]:
+        return self.unesco_data_dict.get(country.iso_alpha2.upper(), [])
+
+    def parse(self, country: models.Country, sites: List[Dict[str, Any]]):
+        rows = [{
+            "unesco_id": str(site["id"]) if site["id"] else None,
+            "name": site["name"],
+            "category": site["category"],
+            "is_danger": site.get("is_danger", False),
+            "is_transnational": site.get("is_transnational", False),
+            "image_url": site["image"],
+            "description": site["description"]
+        } for site in sites]
+        return [
+            ReplaceRows(models.UnescoPlace, rows, source="unesco"),
+            SetFields(models.Country, {"unesco_count": len(sites)}),
+        ]
 
-async def sync_unesco_sites(db: Session):
+async def sync_unesco_sites(db: AsyncSession):
     """Legacy wrapper for syncing UNESCO sites."""
     scraper = UnescoScraper(db)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     
     # Return count of all sites for legacy compatibility
-    synced_sites = db.query(func.count(models.UnescoPlace.id)).scalar()
+    synced_sites = (await scraper.execute(select(func.count(models.UnescoPlace.id)))).scalar()
     results["sites_synced"] = synced_sites
     return results
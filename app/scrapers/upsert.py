@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+from sqlalchemy import Index, delete, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+# Dialects with INSERT ... ON CONFLICT, other databases fall back to delete + insert
+_DIALECT_INSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def natural_key(model: Type) -> Optional[Tuple[str, ...]]:
+    """Columns of the model's unique ux_ index (its natural key), None when it has none"""
+    for index in model.__table__.indexes:
+        if isinstance(index, Index) and index.unique and index.name.startswith("ux_"):
+            return tuple(c.name for c in index.columns)
+    return None
+
+def _dedupe(rows: List[Dict[str, Any]], key: Sequence[str]) -> List[Dict[str, Any]]:
+    """Last row per key: one statement may not update the same row twice (Postgres)"""
+    unique = {}
+    for i, row in enumerate(rows):
+        values = tuple(row.get(c) for c in key)
+        # NULL keys never conflict, keep those rows as they are
+        unique[values if None not in values else ("row", i)] = row
+    return list(unique.values())
+
+def upsert_rows(db: Session, model: Type, rows: List[Dict[str, Any]], key: Sequence[str]):
+    """
+    Insert rows or update the existing ones with the same key, as one executemany
+    statement. Rows equal to the stored ones are not updated (last_updated keeps its value).
+    """
+    if not rows:
+        return
+    table = model.__table__
+    stmt = _DIALECT_INSERT[db.get_bind().dialect.name](table)
+    columns = [c for c in rows[0] if c not in key]
+    values = {c: stmt.excluded[c] for c in columns}
+    if "last_updated" in table.c and "last_updated" not in values:
+        values["last_updated"] = func.now()
+    if columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key), set_=values,
+            where=or_(*(table.c[c].is_distinct_from(stmt.excluded[c]) for c in columns)),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(key))
+    db.execute(stmt, _dedupe(rows, key))
+
+def insert_missing(db: Session, model: Type, rows: List[Dict[str, Any]], key: Sequence[str]):
+    """Insert the rows whose key is not stored yet (ON CONFLICT DO NOTHING), stored rows are kept as they are"""
+    if not rows:
+        return
+    stmt = _DIALECT_INSERT[db.get_bind().dialect.name](model.__table__)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=list(key)), _dedupe(rows, key))
+
+def replace_rows(db: Session, model: Type, country_id: int, rows: List[Dict[str, Any]], where: Sequence = ()):
+    """
+    Make rows (without country_id) the country's rows of model, limited to where.
+    Models with a natural key are upserted and only rows missing from the new data are
+    deleted, others are replaced with a delete and one executemany insert.
+    """
+    table = model.__table__
+    rows = [{**row, "country_id": country_id} for row in rows]
+    scope = (table.c.country_id == country_id, *where)
+    key = natural_key(model)
+    if key is None or db.get_bind().dialect.name not in _DIALECT_INSERT:
+        db.execute(delete(table).where(*scope))
+        if rows:
+            db.execute(insert(table), rows)
+        return
+    wanted = {tuple(row.get(c) for c in key) for row in rows}
+    existing = db.execute(select(table.c.id, *(table.c[c] for c in key)).where(*scope)).all()
+    # Rows with a NULL key can never match new data, they are replaced too
+    stale = [row.id for row in existing if tuple(row[1:]) not in wanted or None in tuple(row[1:])]
+    if stale:
+        db.execute(delete(table).where(table.c.id.in_(stale)))
+    upsert_rows(db, model, rows, key)
@@ -2,10 +2,10 @@ import re
 import logging
 import os
 import random
-from deep_translator import GoogleTranslator
-import httpx
 import asyncio
 from dotenv import load_dotenv
+from ..metrics import SCRAPER_RETRIES
+from .http_client import CircuitOpenError, http_clients
 
 # Load environment variables from .env file
 load_dotenv()
@@ -80,7 +80,8 @@ WIKI_NAME_MAP = {
     "Congo": "CG"
 }
 
-# Known translation fixes for common automated errors
+# Known translation fixes for common automated errors, seeded into the translation
+# memory as manual overrides (see translations.py)
 CURRENCY_FIXES = {
     "Brazilian real": "Real brazylijski",
     "Brazylijski prawdziwy": "Real brazylijski",
@@ -100,22 +101,10 @@ CURRENCY_FIXES = {
     "Korea Południowa zwyciężyła": "Won południowokoreański"
 }
 
-# In-memory cache for translations to avoid redundant API calls
-_TRANSLATION_CACHE = {}
-
 def translate_to_pl(text: str) -> str:
-    if not text: return text
-    if text in CURRENCY_FIXES: return CURRENCY_FIXES[text]
-    if text in _TRANSLATION_CACHE: return _TRANSLATION_CACHE[text]
-    try:
-        translated = GoogleTranslator(source='auto', target='pl').translate(text)
-        translated = normalize_polish_text(translated)
-        if translated in CURRENCY_FIXES: translated = CURRENCY_FIXES[translated]
-        _TRANSLATION_CACHE[text] = translated
-        return translated
-    except Exception as e:
-        logger.error(f"Translation error for '{text}': {e}")
-        return text
+    """Polish translation from the translation memory, machine-translated on a miss"""
+    from .translations import translation_memory
+    return translation_memory.translate(text)
 
 def normalize_polish_text(text: str) -> str:
     if not text: return text
@@ -153,27 +142,23 @@ def get_headers(accept: str = "application/json"):
 async def async_get(url: str, params: dict = None, headers: dict = None, timeout: float = 30.0):
     combined_headers = get_headers()
     if headers: combined_headers.update(headers)
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-        try:
-            response = await client.get(url, params=params, headers=combined_headers)
-            response.raise_for_status()
-            return response
-        except Exception as e:
-            logger.error(f"HTTP Error for {url}: {e}")
-            return None
-
-# Global semaphore to limit concurrent SPARQL requests to Wikidata
-# This helps prevent 504 timeouts by not overwhelming the server
-_WIKIDATA_SEMAPHORE = asyncio.Semaphore(1) 
-_WIKIDATA_DOWN = False # Global flag to skip Wikidata if it's consistently failing
-_WIKIDATA_ERROR_COUNT = 0
+    try:
+        response = await http_clients.get(url, params=params, headers=combined_headers, timeout=timeout)
+        response.raise_for_status()
+        return response
+    except CircuitOpenError:
+        return None
+    except Exception as e:
+        logger.error(f"HTTP Error for {url}: {e}")
+        return None
 
+# Concurrency and pace of SPARQL requests are limited per host by http_clients
+# (HOST_LIMITS / HOST_RATES), which keeps Wikidata from timing out with 504s
 async def async_sparql_get(query: str, description: str = "SPARQL"):
-    """Robust SPARQL query helper with retries and exponential backoff"""
-    global _WIKIDATA_DOWN, _WIKIDATA_ERROR_COUNT
-    if _WIKIDATA_DOWN:
-        return []
-
+    """
+    Robust SPARQL query helper with retries and exponential backoff. When Wikidata keeps
+    failing its circuit breaker opens and queries return [] at once until it recovers.
+    """
     url = "https://query.wikidata.org/sparql"
     headers = get_headers()
     headers["Content-Type"] = "application/x-www-form-urlencoded"
@@ -183,40 +168,37 @@ async def async_sparql_get(query: str, description: str = "SPARQL"):
     base_delay = 15 # Increased from 10
     
     for attempt in range(max_retries):
+        # Retries are only counted (and waited for) when another attempt follows
+        retrying = attempt + 1 < max_retries
         try:
-            async with _WIKIDATA_SEMAPHORE:
-                # Increased timeout to 120s (client side)
-                async with httpx.AsyncClient(timeout=120.0) as client:
-                    resp = await client.post(url, data={'query': query}, headers=headers)
-                    
-                    if resp.status_code == 200:
-                        _WIKIDATA_ERROR_COUNT = max(0, _WIKIDATA_ERROR_COUNT - 1)
-                        return resp.json().get("results", {}).get("bindings", [])
-                    
-                    elif resp.status_code == 429:
-                        delay = base_delay * (2 ** attempt) + random.uniform(0, 5)
-                        logger.warning(f"Wikidata Rate Limit (429) hit ({description}), retrying in {delay:.1f}s... (Attempt {attempt+1}/{max_retries})")
-                        await asyncio.sleep(delay)
-                        
-                    elif resp.status_code in [504, 502, 503]:
-                        delay = base_delay * (attempt + 1) + random.uniform(0, 5)
-                        logger.error(f"Wikidata Server Error {resp.status_code} ({description}) at attempt {attempt+1}. Retrying in {delay:.1f}s...")
-                        _WIKIDATA_ERROR_COUNT += 1
-                        
-                        if _WIKIDATA_ERROR_COUNT > 10:
-                            logger.error("Wikidata consistently failing. Marking as DOWN for this session.")
-                            _WIKIDATA_DOWN = True
-                            
-                        await asyncio.sleep(delay)
-                    else:
-                        error_snippet = resp.text[:300].replace("\n", " ")
-                        logger.error(f"Wikidata error {resp.status_code} for {description}: {error_snippet}")
-                        break
+            # Increased timeout to 120s (client side)
+            resp = await http_clients.post(url, data={'query': query}, headers=headers, timeout=120.0)
+                
+            if resp.status_code == 200:
+                return resp.json().get("results", {}).get("bindings", [])
+                
+            elif resp.status_code == 429:
+                # The rate limiter has slowed down and honours Retry-After before the next attempt
+                logger.warning(f"Wikidata Rate Limit (429) hit ({description}), retrying... (Attempt {attempt+1}/{max_retries})")
+                if retrying:
+                    SCRAPER_RETRIES.labels("wikidata-sparql").inc()
+            elif resp.status_code in [504, 502, 503]:
+                delay = base_delay * (attempt + 1) + random.uniform(0, 5)
+                logger.error(f"Wikidata Server Error {resp.status_code} ({description}) at attempt {attempt+1}. Retrying in {delay:.1f}s...")
+                if retrying:
+                    SCRAPER_RETRIES.labels("wikidata-sparql").inc()
+                    await asyncio.sleep(delay)
+            else:
+                error_snippet = resp.text[:300].replace("\n", " ")
+                logger.error(f"Wikidata error {resp.status_code} for {description}: {error_snippet}")
+                break
+        except CircuitOpenError:
+            logger.debug(f"Skipping {description}, Wikidata circuit is open")
+            break
         except Exception as e:
             logger.error(f"SPARQL request error for {description} (Attempt {attempt+1}): {str(e)}")
-            _WIKIDATA_ERROR_COUNT += 1
-            if attempt == max_retries - 1 and _WIKIDATA_ERROR_COUNT > 5:
-                _WIKIDATA_DOWN = True
-            await asyncio.sleep(base_delay)
+            if retrying:
+                SCRAPER_RETRIES.labels("wikidata-sparql").inc()
+                await asyncio.sleep(base_delay)
                 
     return []
@@ -1,11 +1,13 @@
-import httpx
-from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
 from .. import models
-import asyncio
 import logging
 import re
+from typing import List, NamedTuple, Optional
 from .utils import WIKI_NAME_MAP, get_headers
+from .extract import extract_visas
+from .http_cache import http_cache
+from .http_client import http_clients
+from .parse_pool import parse_pool
 
 logger = logging.getLogger("uvicorn")
 
@@ -14,84 +16,84 @@ async def sync_all_visas(db: Session):
     logger.info(f"Syncing visas from {url}...")
     headers = get_headers()
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            resp = await client.get(url, headers=headers)
-            if resp.status_code != 200:
-                logger.error(f"Wiki returned status {resp.status_code}")
-                return {"error": f"Wiki returned {resp.status_code}"}
-            
-            soup = BeautifulSoup(resp.content, 'html.parser')
-            target_table = None
-            all_tables = soup.find_all('table')
-            
-            for table in all_tables:
-                text = table.get_text().lower()
-                if "visa requirement" in text and "country" in text:
-                    rows = table.find_all('tr')
-                    if len(rows) > 150:
-                        target_table = table
-                        break
-            
-            if not target_table:
-                logger.error("Could not find main visa table on Wikipedia page")
-                return {"error": "Could not find main visa table"}
+    try:
+        resp = await http_clients.get(url, headers={**headers, **http_cache.headers(url)}, timeout=30.0)
+        if resp.status_code == 304:
+            logger.info("Visa article not modified since the last sync")
+            return {"status": "unchanged", "synced": 0}
+        if resp.status_code != 200:
+            logger.error(f"Wiki returned status {resp.status_code}")
+            return {"error": f"Wiki returned {resp.status_code}"}
+        
+        visas = await parse_pool.run(parse_visa_table, resp.text)
+        if visas is None:
+            logger.error("Could not find main visa table on Wikipedia page")
+            return {"error": "Could not find main visa table"}
 
-            synced = 0
-            rows = target_table.find_all('tr')
-            logger.info(f"Found visa table with {len(rows)} rows. Processing...")
-            
-            for row in rows:
-                cols = row.find_all(['td', 'th'])
-                if len(cols) < 2: continue
-                
-                wiki_name = cols[0].get_text(strip=True)
-                if "country" in wiki_name.lower(): continue 
-                
-                wiki_name = re.sub(r'\[.*?\]', '', wiki_name).strip()
-                wiki_name = wiki_name.split('(')[0].strip()
-                
-                requirement = cols[1].get_text(strip=True)
+        synced = 0
+        logger.info(f"Found visa table with {len(visas)} countries. Processing...")
+        
+        for wiki_name, status, is_req in visas:
+            iso2 = WIKI_NAME_MAP.get(wiki_name)
+            country = None
+            if iso2:
+                country = db.query(models.Country).filter(models.Country.iso_alpha2 == iso2).first()
+            if not country:
+                country = db.query(models.Country).filter(
+                    (models.Country.name == wiki_name) | (models.Country.name_pl == wiki_name)
+                ).first()
+            if not country:
+                country = db.query(models.Country).filter(models.Country.name.ilike(f"%{wiki_name}%")).first()
+
+            if country:
+                entry = db.query(models.EntryRequirement).filter(models.EntryRequirement.country_id == country.id).first()
+                if not entry:
+                    entry = models.EntryRequirement(country_id=country.id)
+                    db.add(entry)
                 
-                iso2 = WIKI_NAME_MAP.get(wiki_name)
-                country = None
-                if iso2:
-                    country = db.query(models.Country).filter(models.Country.iso_alpha2 == iso2).first()
-                if not country:
-                    country = db.query(models.Country).filter(
-                        (models.Country.name == wiki_name) | (models.Country.name_pl == wiki_name)
-                    ).first()
-                if not country:
-                    country = db.query(models.Country).filter(models.Country.name.ilike(f"%{wiki_name}%")).first()
+                entry.visa_status = status
+                entry.visa_required = is_req
+                synced += 1
+        
+        db.commit()
+        http_cache.store(url, resp)
+        return {"status": "success", "synced": synced}
+    except Exception as e:
+        return {"error": str(e)}
+
+class Visa(NamedTuple):
+    wiki_name: str
+    status: str
+    visa_required: bool
+
+def parse_visa_table(html: str, engine: Optional[str] = None) -> Optional[List[Visa]]:
+    """Rows of the main visa table, None when the article has none (runs in a parse worker process)"""
+    table = extract_visas(html, engine)
+    if table is None:
+        return None
 
-                if country:
-                    status = "Wiza wymagana"
-                    is_req = True
-                    req_lower = requirement.lower()
-                    
-                    if any(x in req_lower for x in ["not required", "visa-free", "freedom of movement"]):
-                        status = "Wiza niepotrzebna"
-                        is_req = False
-                    elif "on arrival" in req_lower:
-                        status = "Visa on arrival"
-                        is_req = True
-                    elif any(x in req_lower for x in ["evisa", "e-visa", "electronic"]):
-                        status = "e-Visa"
-                        is_req = True
-                    elif any(x in req_lower for x in ["eta", "estavisa"]):
-                        status = "e-Visa / ETA"
-                        is_req = True
-                    
-                    entry = db.query(models.EntryRequirement).filter(models.EntryRequirement.country_id == country.id).first()
-                    if not entry:
-                        entry = models.EntryRequirement(country_id=country.id)
-                        db.add(entry)
-                    
-                    entry.visa_status = status
-                    entry.visa_required = is_req
-                    synced += 1
-            
-            db.commit()
-            return {"status": "success", "synced": synced}
-        except Exception as e:
-            return {"error": str(e)}
+    visas = []
+    for wiki_name, requirement in table:
+        if "country" in wiki_name.lower(): continue 
+        
+        wiki_name = re.sub(r'\[.*?\]', '', wiki_name).strip()
+        wiki_name = wiki_name.split('(')[0].strip()
+        
+        status = "Wiza wymagana"
+        is_req = True
+        req_lower = requirement.lower()
+        
+        if any(x in req_lower for x in ["not required", "visa-free", "freedom of movement"]):
+            status = "Wiza niepotrzebna"
+            is_req = False
+        elif "on arrival" in req_lower:
+            status = "Visa on arrival"
+            is_req = True
+        elif any(x in req_lower for x in ["evisa", "e-visa", "electronic"]):
+            status = "e-Visa"
+            is_req = True
+        elif any(x in req_lower for x in ["eta", "estavisa"]):
+            status = "e-Visa / ETA"
+            is_req = True
+        visas.append(Visa(wiki_name, status, is_req))
+    return visas
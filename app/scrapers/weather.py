@@ -1,12 +1,11 @@
-import httpx
 import os
-import asyncio
 import json
 from sqlalchemy.orm import Session
 from .. import models
 from datetime import datetime
 from sqlalchemy.sql import func
 from .utils import async_get
+from .http_client import HTTPClient, http_clients
 
 # Weather code mapping to conditions and icons (WMO Weather interpretation codes)
 # Based on https://open-meteo.com/en/docs
@@ -40,7 +39,7 @@ WMO_CODE_MAP = {
 def get_weather_info(code):
     return WMO_CODE_MAP.get(code, ("Nieznana", "03d"))
 
-async def update_weather(db: Session, country_iso2: str, client: httpx.AsyncClient = None):
+async def update_weather(db: Session, country_iso2: str, client: HTTPClient = None):
     """Fetch current weather and 7-day forecast using Open-Meteo"""
     
     country = db.query(models.Country).filter(models.Country.iso_alpha2 == country_iso2.upper()).first()
@@ -58,15 +57,9 @@ async def update_weather(db: Session, country_iso2: str, client: httpx.AsyncClie
     }
 
     try:
-        if client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-        else:
-            async with httpx.AsyncClient() as c:
-                response = await c.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+        response = await (client or http_clients).get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
         
         current = data.get("current", {})
         daily = data.get("daily", {})
@@ -117,17 +110,15 @@ async def update_all_weather(db: Session):
     success = 0
     errors = 0
     
-    # Open-Meteo doesn't require API key and has very generous rate limits
-    # We still do them sequentially but faster
-    async with httpx.AsyncClient() as client:
-        for i, country in enumerate(countries):
-            if (i+1) % 50 == 0:
-                print(f"Updating weather: {i+1}/{len(countries)}...")
-            res = await update_weather(db, country.iso_alpha2, client)
-            if "error" in res:
-                errors += 1
-            else:
-                success += 1
-            await asyncio.sleep(0.05) 
+    # Open-Meteo doesn't require API key and has very generous rate limits,
+    # requests are paced by the shared client's rate limiter
+    for i, country in enumerate(countries):
+        if (i+1) % 50 == 0:
+            print(f"Updating weather: {i+1}/{len(countries)}...")
+        res = await update_weather(db, country.iso_alpha2)
+        if "error" in res:
+            errors += 1
+        else:
+            success += 1
     
     return {"success": success, "errors": errors}
@@ -1,5 +1,5 @@
-import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 from .. import models
 import asyncio
@@ -7,7 +7,8 @@ import logging
 import re
 from typing import Any, List
 
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
+from .http_client import HTTPClient, http_clients
 from .utils import get_headers
 
 logger = logging.getLogger("uvicorn")
@@ -16,7 +17,7 @@ class WikiSummaryScraper(BaseScraper):
     """
     Fetches a professional summary from Wikipedia and national symbols from Wikidata.
     """
-    def __init__(self, db: Session, concurrency: int = 5, timeout: float = 20.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 5, timeout: float = 20.0):
         super().__init__(db, concurrency, timeout)
 
     async def sync_country(self, country: models.Country) -> Any:
@@ -24,6 +25,7 @@ class WikiSummaryScraper(BaseScraper):
         wiki_title = name_pl.replace(' ', '_')
         wiki_url = f"https://pl.wikipedia.org/api/rest_v1/page/summary/{wiki_title}"
         headers = get_headers()
+        values = {}
         
         wikidata_query = f"""
         SELECT ?animalLabel ?flowerLabel WHERE {{
@@ -40,7 +42,7 @@ class WikiSummaryScraper(BaseScraper):
             try:
                 wiki_resp = await self.client.get(wiki_url, headers=headers)
                 if wiki_resp.status_code == 200:
-                    country.wiki_summary = wiki_resp.json().get("extract")
+                    values["wiki_summary"] = wiki_resp.json().get("extract")
                     break
                 elif wiki_resp.status_code == 429:
                     await asyncio.sleep(2)
@@ -65,25 +67,25 @@ class WikiSummaryScraper(BaseScraper):
                     if animal and not animal.startswith("Q"): symbols.append(f"Zwierzę: {animal}")
                     if flower and not flower.startswith("Q"): symbols.append(f"Kwiat: {flower}")
                     if symbols:
-                        country.national_symbols = " • ".join(symbols)
+                        values["national_symbols"] = " • ".join(symbols)
         except Exception as e:
             logger.debug(f"Wikidata error for {country.iso_alpha2}: {e}")
             pass
 
-        self.db.commit()
+        await self.update(country, **values)
         return {"status": "success"}
 
-async def sync_wiki_summary(db: Session, country_iso2: str, client: httpx.AsyncClient):
+async def sync_wiki_summary(db: AsyncSession, country_iso2: str, client: HTTPClient = None):
     """Legacy wrapper for syncing a single country's summary."""
     scraper = WikiSummaryScraper(db)
-    scraper.client = client
-    country = db.query(models.Country).filter(models.Country.iso_alpha2 == country_iso2.upper()).first()
+    scraper.client = client or http_clients.client(scraper.timeout, get_headers())
+    country = (await scraper.execute(select(models.Country).where(models.Country.iso_alpha2 == country_iso2.upper()))).scalars().first()
     if not country: return {"error": "Country not found"}
     return await scraper.sync_country(country)
 
-async def sync_all_summaries(db: Session):
+async def sync_all_summaries(db: AsyncSession):
     """Legacy wrapper for syncing all summaries."""
     scraper = WikiSummaryScraper(db, concurrency=20)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     return {"success": results["success"], "errors": results["errors"]}
@@ -1,11 +1,12 @@
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models
 import asyncio
 import logging
 from typing import Any, List
 
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
 from .utils import async_sparql_get
 
 logger = logging.getLogger("uvicorn")
@@ -16,7 +17,7 @@ class WikiAttractionsScraper(BaseScraper):
     """
     Syncs attractions for countries from Wikidata using SPARQL.
     """
-    def __init__(self, db: Session, concurrency: int = 1, timeout: float = 90.0):
+    def __init__(self, db: AsyncSession, concurrency: int = 1, timeout: float = 90.0):
         # Use low concurrency (1) as Wikidata often struggles with many parallel SPARQL queries
         super().__init__(db, concurrency, timeout)
 
@@ -48,10 +49,10 @@ class WikiAttractionsScraper(BaseScraper):
                 name = res.get("itemLabel", {}).get("value")
                 if not name or name.startswith("Q"): continue
 
-                existing = self.db.query(models.Attraction).filter(
+                existing = (await self.execute(select(models.Attraction).where(
                     models.Attraction.country_id == country.id,
                     models.Attraction.name == name
-                ).first()
+                ))).scalars().first()
                 
                 if not existing:
                     self.db.add(models.Attraction(
@@ -66,22 +67,22 @@ class WikiAttractionsScraper(BaseScraper):
                     from sqlalchemy.sql import func
                     existing.last_updated = func.now()
             
-            self.db.commit()
+            await self.commit()
             return {"status": "success", "added_count": count}
         except Exception as e:
             logger.error(f"Error syncing attractions for {iso}: {e}")
             return {"error": str(e)}
 
-async def sync_wiki_attractions_batch(db: Session, countries: list[models.Country]):
+async def sync_wiki_attractions_batch(db: AsyncSession, countries: list[models.Country]):
     """Legacy wrapper for batch sync. Now uses WikiAttractionsScraper for each country."""
     scraper = WikiAttractionsScraper(db)
     for country in countries:
         await scraper.sync_country(country)
         await asyncio.sleep(0.5)
 
-async def sync_all_wiki_attractions(db: Session):
+async def sync_all_wiki_attractions(db: AsyncSession):
     """Legacy wrapper for syncing all attractions."""
     scraper = WikiAttractionsScraper(db, concurrency=1)
-    countries = db.query(models.Country).all()
+    countries = await load_countries(db)
     results = await scraper.run(countries)
     return {"success": results["success"], "errors": results["errors"]}
@@ -1,15 +1,15 @@
 import asyncio
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 from .. import models
 from .utils import async_sparql_get
-from .base import BaseScraper
+from .base import BaseScraper, load_countries
 
 logger = logging.getLogger("uvicorn")
 
 class WikidataInfoScraper(BaseScraper):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         # SPARQL is handled by a global semaphore in utils, so concurrency here can be higher for orchestration
         super().__init__(db, concurrency=5, timeout=120.0)
 
@@ -58,12 +58,12 @@ class WikidataInfoScraper(BaseScraper):
                 try: country.population = int(float(country.population))
                 except: pass
             
-            self.db.commit()
+            await self.commit()
             return {"status": "success"}
         except Exception as e:
             return {"error": str(e)}
 
-async def sync_all_wikidata_info(db: Session):
-    countries = db.query(models.Country).all()
+async def sync_all_wikidata_info(db: AsyncSession):
+    countries = await load_countries(db)
     scraper = WikidataInfoScraper(db)
     return await scraper.run(countries)
@@ -0,0 +1,140 @@
+import html
+import logging
+import re
+import unicodedata
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+
+logger = logging.getLogger("uvicorn")
+
+# Letters without a Unicode decomposition that unicode61 would not fold
+_FOLD_MAP = {"ł": "l", "Ł": "l", "ø": "o", "Ø": "o", "đ": "d", "Đ": "d", "ß": "s", "æ": "a", "Æ": "a"}
+
+# PracticalInfo text columns included in the index
+PRACTICAL_TEXT_FIELDS = (
+    "store_hours", "internet_notes", "health_info", "roaming_info", "atm_advice",
+    "bargaining_info", "customs_rules", "alcohol_rules", "dress_code",
+    "photography_restrictions", "sensitive_topics", "local_norms", "souvenirs",
+)
+
+SEARCH_KINDS = ("country", "attraction", "unesco", "law", "practical")
+
+def _fold_char(ch: str) -> str:
+    folded = _FOLD_MAP.get(ch) or unicodedata.normalize("NFD", ch)[0]
+    return folded.lower()[0]
+
+def fold_text(value: Optional[str]) -> str:
+    """
+    Lowercase and strip Polish (and other) diacritics, one character per character,
+    so offsets in the folded text are valid offsets in the original.
+    """
+    return "".join(_fold_char(ch) for ch in value) if value else ""
+
+def is_supported(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+def rebuild_search_index(db: Session) -> int:
+    """Recreate the FTS5 index from the current country content. Called at the end of sync."""
+    if not is_supported(db):
+        logger.info("Search index skipped: FTS5 requires SQLite")
+        return 0
+
+    rows = []
+    countries = db.query(models.Country).all()
+    names = {c.id: c.name_pl or c.name for c in countries}
+    iso = {c.id: c.iso_alpha2 for c in countries}
+
+    for c in countries:
+        rows.append(("country", c.iso_alpha2, names[c.id], c.wiki_summary))
+    for a in db.query(models.Attraction).all():
+        rows.append(("attraction", iso.get(a.country_id), a.name, a.description))
+    for u in db.query(models.UnescoPlace).all():
+        rows.append(("unesco", iso.get(u.country_id), u.name, u.description))
+    for lc in db.query(models.LawAndCustom).all():
+        rows.append(("law", iso.get(lc.country_id), lc.title, lc.description))
+    for p in db.query(models.PracticalInfo).all():
+        body = "\n".join(getattr(p, f) for f in PRACTICAL_TEXT_FIELDS if getattr(p, f))
+        if body:
+            rows.append(("practical", iso.get(p.country_id), names.get(p.country_id), body))
+
+    db.execute(text("DROP TABLE IF EXISTS search_index"))
+    db.execute(text(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "title, body, kind UNINDEXED, iso2 UNINDEXED, title_raw UNINDEXED, body_raw UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    params = [
+        {"title": fold_text(title), "body": fold_text(body), "kind": kind, "iso2": iso2,
+         "title_raw": title or "", "body_raw": body or ""}
+        for kind, iso2, title, body in rows if iso2 and (title or body)
+    ]
+    if params:
+        db.execute(text(
+            "INSERT INTO search_index (title, body, kind, iso2, title_raw, body_raw) "
+            "VALUES (:title, :body, :kind, :iso2, :title_raw, :body_raw)"
+        ), params)
+    db.commit()
+    logger.info(f"Search index rebuilt with {len(params)} documents")
+    return len(params)
+
+def ensure_search_index(db: Session):
+    """Build the index on first start if no sync has created it yet"""
+    if not is_supported(db):
+        return
+    exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")).first()
+    if not exists:
+        rebuild_search_index(db)
+
+def _match_expression(terms: List[str]) -> str:
+    # Every term must match, as a prefix (so "krakow" also finds "krakowski")
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+def make_snippet(raw: str, terms: List[str], width: int = 200) -> str:
+    """
+    Window of the original text around the first match as HTML: the scraped text is
+    escaped, matches are wrapped in <b></b>
+    """
+    if not raw:
+        return ""
+    folded = fold_text(raw)
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\w*")
+    first = pattern.search(folded)
+    start = max(0, first.start() - width // 4) if first else 0
+    end = min(len(raw), start + width)
+
+    parts, pos = [], start
+    for m in pattern.finditer(folded, start, end):
+        parts.append(html.escape(raw[pos:m.start()]))
+        parts.append(f"<b>{html.escape(raw[m.start():m.end()])}</b>")
+        pos = m.end()
+    parts.append(html.escape(raw[pos:end]))
+    return ("…" if start > 0 else "") + "".join(parts).strip() + ("…" if end < len(raw) else "")
+
+def search(db: Session, query: str, kind: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """Ranked (bm25, title weighted 5x) full-text search over the index"""
+    terms = re.findall(r"\w+", fold_text(query))
+    if not terms:
+        return []
+
+    sql = (
+        "SELECT kind, iso2, title_raw, body_raw, bm25(search_index, 5.0, 1.0) AS score "
+        "FROM search_index WHERE search_index MATCH :match"
+    )
+    params = {"match": _match_expression(terms), "limit": limit}
+    if kind:
+        sql += " AND kind = :kind"
+        params["kind"] = kind
+    sql += " ORDER BY score LIMIT :limit"
+
+    results = []
+    for row in db.execute(text(sql), params):
+        results.append({
+            "kind": row.kind,
+            "iso2": row.iso2,
+            "title": row.title_raw,
+            "snippet": make_snippet(row.body_raw or row.title_raw, terms),
+            "score": round(-row.score, 4),
+        })
+    return results
@@ -0,0 +1,40 @@
+import orjson
+from typing import Optional
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Pick JSON or MessagePack from an Accept header. Highest q wins, then
+    explicit types over wildcards, then the order in the header.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q <= 0:
+            continue
+        if media_type in MSGPACK_MEDIA_TYPES:
+            candidates.append((q, 1, -position, MSGPACK_MEDIA_TYPE))
+        elif media_type == JSON_MEDIA_TYPE:
+            candidates.append((q, 1, -position, JSON_MEDIA_TYPE))
+        elif media_type in ("application/*", "*/*"):
+            candidates.append((q, 0, -position, JSON_MEDIA_TYPE))
+    return max(candidates)[3] if candidates else JSON_MEDIA_TYPE
+
+def json_to_msgpack(body: bytes) -> bytes:
+    """Re-encode an already serialized JSON document as MessagePack"""
+    import msgpack  # only needed by clients asking for MessagePack
+    return msgpack.packb(orjson.loads(body), use_bin_type=True)
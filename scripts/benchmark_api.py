@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import platform
+import sqlite3
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+DEFAULT_DB = os.path.join(PROJECT_ROOT, "scripts", "travel_cheatsheet.db")
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "bench_results")
+
+# Share of each call type in the load (roughly the frontend's traffic)
+DEFAULT_MIX = {"list": 20, "detail": 50, "batch": 15, "search": 15}
+CONTINENTS = ("Africa", "Asia", "Europe", "North America", "South America", "Oceania")
+RISK_LEVELS = ("low", "medium", "high", "critical")
+SEARCH_TERMS = (
+    "krakow", "plaza", "muzeum", "katedra", "gory", "zamek", "wulkan", "pustynia",
+    "swiatynia", "park narodowy", "alkohol", "napiwki", "roaming", "szczepienia", "bankomat",
+)
+DETAIL_SELECTIONS = (
+    {"fields": "name_pl,capital,flag_emoji"},
+    {"fields": "name_pl", "include": "safety,holidays"},
+    {"include": "practical,costs"},
+)
+
+def prepare_fixture(source: str, target: str):
+    """
+    Copy the fixture into a database with the current schema, so the benchmark never
+    writes to the source file and older fixtures still work after model changes.
+    Columns missing in the source get the model's scalar default.
+    """
+    from sqlalchemy import create_engine
+    from app import models
+
+    engine = create_engine(f"sqlite:///{target}")
+    models.Base.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(target)
+    conn.execute("ATTACH DATABASE ? AS src", (source,))
+    source_tables = {r[0] for r in conn.execute("SELECT name FROM src.sqlite_master WHERE type = 'table'")}
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in source_tables:
+            continue
+        source_columns = {r[1] for r in conn.execute(f'PRAGMA src.table_info("{table.name}")')}
+        columns = [c.name for c in table.columns if c.name in source_columns]
+        names = ", ".join(f'"{c}"' for c in columns)
+        # Older fixtures may hold duplicates of keys now unique, keep the newest row (as create_missing_indexes)
+        keep = []
+        for index in table.indexes:
+            keys = [c.name for c in index.columns]
+            if index.unique and "id" in source_columns and all(k in source_columns for k in keys):
+                key_names = ", ".join(f'"{k}"' for k in keys)
+                nulls = " OR ".join(f'"{k}" IS NULL' for k in keys)
+                keep.append(f'({nulls} OR id IN (SELECT MAX(id) FROM src."{table.name}" GROUP BY {key_names}))')
+        where = f" WHERE {' AND '.join(keep)}" if keep else ""
+        conn.execute(f'INSERT INTO main."{table.name}" ({names}) SELECT {names} FROM src."{table.name}"{where}')
+        for column in table.columns:
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None and column.name not in source_columns:
+                conn.execute(f'UPDATE main."{table.name}" SET "{column.name}" = ? WHERE "{column.name}" IS NULL', (default,))
+    conn.commit()
+    conn.close()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(db_path: str, port: int, log_path: str) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+def wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if httpx.get(f"{base_url}/api/countries/", params={"limit": 1}, timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API not ready after {timeout:.0f}s")
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown call type: {kind}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+class Workload:
+    """Builds requests of each call type from the countries in the fixture"""
+    def __init__(self, countries: list, conditional_ratio: float):
+        self.codes = [c["iso_alpha2"] for c in countries] + [c["iso_alpha3"] for c in countries]
+        self.regions = sorted({c["region"] for c in countries if c.get("region")})
+        self.conditional_ratio = conditional_ratio
+        # Last ETag seen per URL, replayed as If-None-Match like a browser cache would
+        self.etags = {}
+
+    def build(self, kind: str, rng: random.Random):
+        if kind == "list":
+            params = rng.choice([
+                {}, {"continent": rng.choice(CONTINENTS)}, {"region": rng.choice(self.regions or [None])},
+                {"has_ekuz": "true"}, {"risk_level": rng.choice(RISK_LEVELS)}, {"visa_required": "false"},
+            ])
+            return "/api/countries/", {k: v for k, v in params.items() if v is not None}
+        if kind == "detail":
+            params = rng.choice(DETAIL_SELECTIONS) if rng.random() < 0.2 else {}
+            return f"/api/countries/{rng.choice(self.codes)}", params
+        if kind == "batch":
+            return "/api/countries/batch", {"iso": ",".join(rng.sample(self.codes, rng.randint(2, 10)))}
+        return "/api/search/", {"q": rng.choice(SEARCH_TERMS)}
+
+    def headers(self, url: str, rng: random.Random) -> dict:
+        etag = self.etags.get(url)
+        return {"If-None-Match": etag} if etag and rng.random() < self.conditional_ratio else {}
+
+async def worker(client: httpx.AsyncClient, workload: Workload, mix: dict, rng: random.Random,
+                 start_at: float, stop_at: float, samples: list):
+    kinds, weights = list(mix), list(mix.values())
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        kind = rng.choices(kinds, weights)[0]
+        path, params = workload.build(kind, rng)
+        url = str(client.build_request("GET", path, params=params).url)
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, headers=workload.headers(url, rng))
+            status = response.status_code
+            if "etag" in response.headers:
+                workload.etags[url] = response.headers["etag"]
+        except httpx.HTTPError:
+            status = 0
+        elapsed = time.perf_counter() - started
+        # Requests of the warm-up period are not measured
+        if started >= start_at:
+            samples.append((kind, status, elapsed))
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(samples: list, duration: float) -> dict:
+    latencies = sorted(s[2] for s in samples)
+    errors = sum(1 for s in samples if s[1] == 0 or s[1] >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "not_modified": sum(1 for s in samples if s[1] == 304),
+        "statuses": {str(code): sum(1 for s in samples if s[1] == code) for code in sorted({s[1] for s in samples})},
+        "rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+async def run_load(base_url: str, concurrency: int, duration: float, warmup: float, mix: dict,
+                   seed: int, conditional_ratio: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        countries = (await client.get("/api/countries/", params={"limit": 1000})).json()
+        if not countries:
+            raise RuntimeError("The fixture database has no countries")
+        workload = Workload(countries, conditional_ratio)
+
+        samples = []
+        start_at = time.perf_counter() + warmup
+        stop_at = start_at + duration
+        await asyncio.gather(*(
+            worker(client, workload, mix, random.Random(seed + i), start_at, stop_at, samples)
+            for i in range(concurrency)
+        ))
+
+    results = {"total": summarize(samples, duration)}
+    for kind in mix:
+        results[kind] = summarize([s for s in samples if s[0] == kind], duration)
+    return results
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except OSError:
+        return "unknown"
+
+def print_report(results: dict, previous: dict = None):
+    print(f"\n{'call':<8}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, r in results.items():
+        print(f"{kind:<8}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+        old = (previous or {}).get(kind)
+        if old:
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                change = (r[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                deltas.append(f"{change:>+9.1f}%")
+            print(f"{'  vs old':<8}{'':>18}{deltas[0]:>10}{deltas[1]:>10}{deltas[2]:>10}{deltas[3]:>10}")
+
+def benchmark(args):
+    mix = {k: v for k, v in args.mix.items() if v > 0}
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix="travelsheet-bench-")
+    server = None
+    try:
+        base_url = args.url
+        if not base_url:
+            db_path = os.path.join(workdir, "fixture.db")
+            prepare_fixture(os.path.abspath(args.db), db_path)
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            log_path = os.path.join(workdir, "server.log")
+            server = start_server(db_path, port, log_path)
+            try:
+                wait_ready(base_url, server)
+            except RuntimeError:
+                with open(log_path) as f:
+                    print(f.read())
+                raise
+
+        print(f"Benchmarking {base_url}: concurrency {args.concurrency}, {args.duration:.0f}s "
+              f"(+{args.warmup:.0f}s warm-up), mix {mix}")
+        results = asyncio.run(run_load(base_url, args.concurrency, args.duration, args.warmup, mix,
+                                       args.seed, args.conditional_ratio))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "label": args.label,
+            "python": platform.python_version(),
+            "url": args.url,
+            "db": None if args.url else os.path.relpath(os.path.abspath(args.db), PROJECT_ROOT),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": mix,
+            "seed": args.seed,
+            "conditional_ratio": args.conditional_ratio,
+        },
+        "results": results,
+    }
+    print_report(results, previous["results"] if previous else None)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"api-{datetime.now().strftime('%Y%m%d-%H%M%S')}{'-' + args.label if args.label else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if results["total"]["errors"]:
+        print(f"[WARN] {results['total']['errors']} failed requests")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the read API (list, detail, batch, search)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Fixture SQLite database (copied, never modified)")
+    parser.add_argument("--url", help="Benchmark an already running API instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. list=20,detail=50,batch=15,search=15")
+    parser.add_argument("--conditional-ratio", type=float, default=0.2,
+                        help="Share of repeated URLs sent with If-None-Match")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="Name stored in the results (e.g. the branch)")
+    parser.add_argument("--output", help="Results file (default bench_results/api-<time>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare with")
+    benchmark(parser.parse_args())
@@ -0,0 +1,61 @@
+import os
+import sys
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the read-only API must not pull in at import time (scraper-only dependencies)
+FORBIDDEN_MODULES = ("app.scrapers", "bs4", "lxml", "deep_translator", "dotenv", "msgpack")
+
+def measure_imports(module: str):
+    """Run `python -X importtime -c "import <module>"` and return {module: (self_us, cumulative_us)}"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        print(f"[ERROR] import {module} failed")
+        sys.exit(1)
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def check_import_time(module: str = "app.main", budget_ms: float = 2500):
+    """Fail when importing the API exceeds the budget or loads scraper dependencies"""
+    timings = measure_imports(module)
+    total_ms = timings[module][1] / 1000
+    errors = []
+
+    print(f"import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    print("\nSlowest modules (cumulative):")
+    top_level = [(name, cum) for name, (_, cum) in timings.items() if "." not in name or name.startswith("app.")]
+    for name, cum in sorted(top_level, key=lambda x: -x[1])[:10]:
+        print(f"   {cum / 1000:8.1f} ms  {name}")
+
+    if total_ms > budget_ms:
+        errors.append(f"import took {total_ms:.0f} ms, budget is {budget_ms:.0f} ms")
+    for name in timings:
+        if any(name == m or name.startswith(m + ".") for m in FORBIDDEN_MODULES):
+            errors.append(f"{name} is imported at startup")
+
+    if errors:
+        print("\n[ERROR] Import-time check failed:")
+        for e in errors:
+            print(f" - {e}")
+        sys.exit(1)
+    print("\n[OK] API imports within budget, no scraper dependencies loaded.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time budget check for the API process")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "2500")))
+    args = parser.parse_args()
+    check_import_time(args.module, args.budget_ms)
@@ -0,0 +1,112 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from app.scrapers.cdc_health import parse_vaccines
+from app.scrapers.extract import extract_msz, extract_vaccines, extract_visas, lxml
+from app.scrapers.msz_gov_pl import parse_advisory
+from app.scrapers.visa_wiki import parse_visa_table
+
+FIXTURES_DIR = os.path.join(PROJECT_ROOT, "scripts", "fixtures", "html")
+
+# File name prefix -> (extraction, parse function); msz_<iso2>.html pages are parsed for that country
+PARSERS = {
+    "msz": (extract_msz, lambda html, iso2, engine: parse_advisory(html, iso2, engine)),
+    "cdc": (extract_vaccines, lambda html, iso2, engine: parse_vaccines(html, engine)),
+    "wiki": (extract_visas, lambda html, iso2, engine: parse_visa_table(html, engine)),
+}
+
+def load_pages(dirs):
+    pages = []
+    for directory in dirs:
+        for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+            name = os.path.basename(path)[:-len(".html")]
+            kind, _, suffix = name.partition("_")
+            if kind not in PARSERS:
+                print(f"[SKIP] {path}: name must start with {', '.join(p + '_' for p in PARSERS)}")
+                continue
+            with open(path, encoding="utf-8") as f:
+                pages.append((name, kind, suffix.upper(), f.read()))
+    return pages
+
+def first_difference(a, b):
+    """Short description of where two extraction results differ"""
+    if hasattr(a, "_fields") and hasattr(b, "_fields"):
+        for field in a._fields:
+            if getattr(a, field) != getattr(b, field):
+                return f"{field}: {first_difference(getattr(a, field), getattr(b, field))}"
+    if isinstance(a, str) and isinstance(b, str):
+        i = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+        return f"at {i}: {a[max(0, i - 40):i + 40]!r} != {b[max(0, i - 40):i + 40]!r}"
+    if isinstance(a, list) and isinstance(b, list):
+        for i, (x, y) in enumerate(zip(a, b)):
+            if x != y:
+                return f"item {i}: {x!r} != {y!r}"
+        return f"{len(a)} items != {len(b)} items"
+    return f"{a!r} != {b!r}"
+
+def check_equivalence(pages):
+    """The lxml extraction must give exactly what BeautifulSoup (html.parser) gives"""
+    errors = []
+    for name, kind, iso2, html in pages:
+        extract, parse = PARSERS[kind]
+        found = len(errors)
+        for label, run in (("extract", lambda engine: extract(html, engine)),
+                           ("parse", lambda engine: parse(html, iso2, engine))):
+            reference, fast = run("bs4"), run("lxml")
+            if reference != fast:
+                errors.append(f"{name} ({label}) {first_difference(reference, fast)}")
+        print(f"  {name:<20} {'OK' if len(errors) == found else 'DIFF'}")
+    return errors
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def compare_speed(pages, repeat):
+    print(f"\n{'page':<20} {'size':>8} {'bs4 ms':>9} {'lxml ms':>9} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for name, kind, _, html in pages:
+        extract = PARSERS[kind][0]
+        bs4_ms = timed(lambda: extract(html, "bs4"), repeat)
+        lxml_ms = timed(lambda: extract(html, "lxml"), repeat)
+        totals[0] += bs4_ms
+        totals[1] += lxml_ms
+        print(f"{name:<20} {len(html) // 1024:>6}KB {bs4_ms:>9.2f} {lxml_ms:>9.2f} {bs4_ms / lxml_ms:>7.1f}x")
+    print(f"{'total':<20} {'':>8} {totals[0]:>9.2f} {totals[1]:>9.2f} {totals[0] / totals[1]:>7.1f}x")
+
+def check_parsers(dirs, repeat: int = 20):
+    if lxml is None:
+        print("[ERROR] lxml is not installed (pip install -r requirements.txt)")
+        sys.exit(1)
+    pages = load_pages(dirs)
+    if not pages:
+        print("[ERROR] no pages to check")
+        sys.exit(1)
+
+    print(f"Comparing lxml with BeautifulSoup on {len(pages)} pages...")
+    errors = check_equivalence(pages)
+    compare_speed(pages, repeat)
+
+    if errors:
+        print(f"\n[FAILED] {len(errors)} differences:")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("\n[SUCCESS] Both engines extract the same data.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the lxml HTML extraction matches BeautifulSoup and compare their speed")
+    parser.add_argument('--pages', nargs='*', default=[],
+                        help='Extra directories of saved pages (msz_<iso2>.html, cdc_<name>.html, wiki_<name>.html)')
+    parser.add_argument('--repeat', type=int, default=20, help='Parses per page and engine for the timings')
+    args = parser.parse_args()
+
+    check_parsers([FIXTURES_DIR, *args.pages], args.repeat)
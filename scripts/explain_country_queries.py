@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, engine, create_missing_indexes
+from app import models, crud
+
+# Filter combinations served by GET /api/countries
+CASES = {
+    "first page": {},
+    "keyset page": {"after": "DE"},
+    "continent": {"continent": "Europe", "after": "DE"},
+    "region": {"region": "Asia"},
+    "has_ekuz": {"has_ekuz": True, "after": "DE"},
+    "risk_level": {"risk_level": "high"},
+    "visa_required": {"visa_required": False, "after": "DE"},
+    "continent + risk_level + visa": {"continent": "Africa", "risk_level": "medium", "visa_required": True},
+}
+
+def explain_country_queries():
+    """Print SQLite query plans for the country list filters and fail on full table scans"""
+    models.Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
+    db = SessionLocal()
+    errors = []
+    try:
+        for name, params in CASES.items():
+            stmt = crud.countries_query(limit=50, **params)
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql).fetchall()
+            print(f"\n== {name} {params}")
+            for row in plan:
+                detail = row[-1]
+                print(f"   {detail}")
+                # "SCAN countries USING INDEX ..." on the unfiltered first page is bounded by LIMIT
+                if detail.startswith("SCAN") and "USING" not in detail:
+                    errors.append(f"{name}: {detail}")
+    finally:
+        db.close()
+
+    if errors:
+        print("\n[ERROR] Full table scans found:")
+        for e in errors:
+            print(f" - {e}")
+        sys.exit(1)
+    print("\n[OK] All country list queries use indexes.")
+
+if __name__ == "__main__":
+    explain_country_queries()
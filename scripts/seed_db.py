@@ -5,13 +5,14 @@ import sys
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, engine, create_missing_indexes
 from app.scrapers import rest_countries
 from app import models
 
 async def seed_basic():
     # Create tables
     models.Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
     
     db = SessionLocal()
     print("Starting basic database seeding (Countries only)...")
@@ -8,8 +8,10 @@ import argparse
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, AsyncSessionLocal, engine, create_missing_indexes
 from app import models
+from app.cache import bump_data_version
+from app.search import rebuild_search_index
 from app.scrapers import (
     unesco, msz_gov_pl, wiki_summaries, weather, holidays, 
     costs, cdc_health, embassies, emergency, climate, 
@@ -17,6 +19,8 @@ from app.scrapers import (
     wikidata_attractions, wikidata_info, transport_apps,
     currency_visuals
 )
+from app.scrapers.http_client import http_clients
+from app.scrapers.parse_pool import parse_pool
 from scripts.export_to_json import export_all
 
 # Configure logging
@@ -54,8 +58,12 @@ async def run_sync(mode="full"):
 
     # Create tables if they don't exist
     models.Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
 
+    # REST Countries, static data, weather and visuals use the sync session,
+    # BaseScraper-based scrapers the async one (their DB I/O does not block HTTP fetches)
     db = SessionLocal()
+    adb = AsyncSessionLocal()
     try:
         # --- PHASE 1: MANDATORY / DAILY (Parallelized where possible) ---
         print("--- PHASE 1: Daily / Mandatory Data ---")
@@ -68,8 +76,8 @@ async def run_sync(mode="full"):
         # 2-3. Exchange Rates and MSZ (These are independent)
         print("[2-3/4] Syncing Rates and MSZ Safety in parallel...")
         results = await asyncio.gather(
-            exchange_rates.sync_rates(db),
-            msz_gov_pl.scrape_all_with_cache(db)
+            exchange_rates.sync_rates(adb),
+            msz_gov_pl.scrape_all_with_cache(adb)
         )
         log_result("Exchange Rates", results[0])
         log_result("MSZ Safety", results[1])
@@ -90,11 +98,11 @@ async def run_sync(mode="full"):
             print("[5-9/18] Syncing Static, EKUZ, UNESCO, Emergency, and Costs...")
             static_info.sync_static_data(db)
             static_info.sync_ekuz_data(db)
-            res_costs = await costs.sync_costs(db)
+            res_costs = await costs.sync_costs(adb)
             
             res_unesco, res_emergency = await asyncio.gather(
-                unesco.sync_unesco_sites(db),
-                emergency.sync_emergency_numbers(db)
+                unesco.sync_unesco_sites(adb),
+                emergency.sync_emergency_numbers(adb)
             )
             log_result("Costs", res_costs)
             log_result("UNESCO", res_unesco)
@@ -103,10 +111,10 @@ async def run_sync(mode="full"):
             # Group B: External API heavy data
             print("[10-13/18] Syncing Climate, Wiki Summaries, Holidays, and CDC...")
             res_group_b = await asyncio.gather(
-                climate.sync_all_climate(db, force=True),
-                wiki_summaries.sync_all_summaries(db),
-                holidays.sync_all_holidays(db),
-                cdc_health.sync_all_cdc(db)
+                climate.sync_all_climate(adb, force=True),
+                wiki_summaries.sync_all_summaries(adb),
+                holidays.sync_all_holidays(adb),
+                cdc_health.sync_all_cdc(adb)
             )
             log_result("Climate", res_group_b[0])
             log_result("Wiki Summaries", res_group_b[1])
@@ -115,16 +123,16 @@ async def run_sync(mode="full"):
 
             # Group C: Scrapers & Wikidata
             print("[14-17/18] Syncing Embassies, Wikidata, Apps and Visuals...")
-            res_embassies = await embassies.scrape_embassies(db)
+            res_embassies = await embassies.scrape_embassies(adb)
             log_result("Embassies", res_embassies)
             
-            res_wiki_attr = await wikidata_attractions.sync_all_wiki_attractions(db)
+            res_wiki_attr = await wikidata_attractions.sync_all_wiki_attractions(adb)
             log_result("Wiki Attractions", res_wiki_attr)
             
-            res_wiki_info = await wikidata_info.sync_all_wikidata_info(db)
+            res_wiki_info = await wikidata_info.sync_all_wikidata_info(adb)
             log_result("Wiki Info", res_wiki_info)
 
-            res_transport = await transport_apps.sync_transport_apps(db)
+            res_transport = await transport_apps.sync_transport_apps(adb)
             log_result("Transport Apps", res_transport)
 
             res_visuals = await currency_visuals.sync_all_currency_visuals(db)
@@ -137,6 +145,10 @@ async def run_sync(mode="full"):
             
             print("✅ Phase 2 completed.\n")
 
+        # Rebuild full-text search and invalidate API response caches
+        rebuild_search_index(db)
+        bump_data_version(db)
+
         # FINAL Export to JSON
         print("--- Final Exporting to docs/data.json ---")
         export_all()
@@ -145,6 +157,7 @@ async def run_sync(mode="full"):
         print("\n" + "="*50)
         print(f"🎉 {mode.upper()} SYNC COMPLETED in {duration/60:.1f} minutes!")
         print("="*50 + "\n")
+        http_clients.log_summary()
 
     except Exception as e:
         print(f"\n💥 CRITICAL SYNC ERROR: {e}")
@@ -152,6 +165,9 @@ async def run_sync(mode="full"):
         sys.exit(1)
     finally:
         db.close()
+        await adb.close()
+        await http_clients.aclose()
+        parse_pool.shutdown()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Sync travel data')